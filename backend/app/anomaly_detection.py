@@ -1,106 +1,318 @@
+from bisect import bisect_left, bisect_right
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
-import statistics
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import logging
+import threading
+import time
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import event, func, and_, insert, inspect
 
+from app.database import SessionLocal
 from app.models import UtilityReading, Alert, Building, AlertType, AlertStatus, UtilityType, AlertRule
+from app.rollups import naive_utc
+
+
+# Only these columns are needed to evaluate history; selecting them as plain rows
+# avoids hydrating full UtilityReading objects (notes, unit, created_at, ...).
+_HISTORY_COLUMNS = (
+    UtilityReading.id,
+    UtilityReading.building_id,
+    UtilityReading.utility_type,
+    UtilityReading.value,
+    UtilityReading.reading_date,
+)
+
+
+class _History:
+    """
+    Earlier readings (rows of `_HISTORY_COLUMNS`) of one building/utility, kept
+    sorted by reading_date so time windows and "previous reading" lookups are
+    bisect slices rather than scans. Rows with equal dates keep insertion order.
+    """
+
+    __slots__ = ("dates", "rows")
+
+    def __init__(self, rows: Iterable[Any] = ()):
+        self.dates: List[datetime] = []
+        self.rows: List[Any] = []
+        for row in rows:
+            self.add(row)
+
+    def add(self, row: Any) -> None:
+        reading_date = naive_utc(row.reading_date)
+        index = bisect_right(self.dates, reading_date)
+        self.dates.insert(index, reading_date)
+        self.rows.insert(index, row)
+
+    def since(self, cutoff: datetime) -> Iterable[Any]:
+        """Rows dated at or after `cutoff` (later-dated rows included), newest first."""
+        rows = self.rows
+        return (rows[i] for i in range(len(rows) - 1, bisect_left(self.dates, cutoff) - 1, -1))
+
+    def latest_before(self, moment: datetime) -> Optional[Any]:
+        index = bisect_left(self.dates, moment)
+        return self.rows[index - 1] if index else None
+
+    def newest(self, count: int, reading: Any, reading_date: datetime) -> List[Any]:
+        """The `count` newest entries of the history plus `reading`, newest first."""
+        rows = self.rows
+        # `reading` sorts after history rows with the same date.
+        position = bisect_right(self.dates, reading_date)
+        newest: List[Any] = []
+        for i in range(len(rows) - 1, position - 1, -1):
+            if len(newest) == count:
+                return newest
+            newest.append(rows[i])
+        if len(newest) < count:
+            newest.append(reading)
+        for i in range(position - 1, -1, -1):
+            if len(newest) == count:
+                break
+            newest.append(rows[i])
+        return newest
+
+
+def _mean_stdev(values) -> Tuple[int, float, float]:
+    """Count, mean and sample standard deviation in one pass (Welford's algorithm)."""
+    n = 0
+    mean = 0.0
+    m2 = 0.0
+    for x in values:
+        n += 1
+        delta = x - mean
+        mean += delta / n
+        m2 += delta * (x - mean)
+    return n, mean, (m2 / (n - 1)) ** 0.5 if n > 1 else 0.0
+
+
+logger = logging.getLogger("anomaly_detection")
+
+# utility_type -> (expires_at, detached copies of the active rules). Rules change
+# rarely, so each worker re-reads them at most once per TTL; the alert-rule
+# routes call invalidate_rules_cache() so edits apply immediately in-process.
+RULES_CACHE_TTL_SECONDS = 30.0
+_rules_cache: Dict[UtilityType, Tuple[float, List[AlertRule]]] = {}
+
+
+def invalidate_rules_cache() -> None:
+    """Drop cached alert rules; the next check re-reads them from the database."""
+    _rules_cache.clear()
+
+
+def _get_active_rules(db: Session, utility_type: UtilityType) -> List[AlertRule]:
+    cached = _rules_cache.get(utility_type)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+
+    columns = [attr.key for attr in inspect(AlertRule).column_attrs]
+    rules = [
+        # Plain copies, never attached to a session, so they outlive the request.
+        AlertRule(**{key: getattr(rule, key) for key in columns})
+        for rule in db.query(AlertRule).filter(
+            and_(
+                AlertRule.is_active == True,  # noqa: E712
+                AlertRule.utility_type == utility_type,
+            )
+        ).all()
+    ]
+    _rules_cache[utility_type] = (time.monotonic() + RULES_CACHE_TTL_SECONDS, rules)
+    return rules
+
+
+# User-facing message per rule condition, formatted only once a rule has triggered.
+_RULE_MESSAGES = {
+    "threshold": "{utility} reading {value:.2f} {unit} exceeded configured limit {limit:.2f} {unit}.".format,
+    "zscore": "{utility} reading {value:.2f} {unit} deviated significantly from recent pattern.".format,
+    "rate_of_change": "{utility} usage changed too quickly compared to previous readings.".format,
+}
+
+
+# (building_id, utility_type) pairs known to have a PENDING continuous-high alert.
+# Only a positive short-circuit: a missing key still falls back to SQL. The whole
+# set is reloaded every TTL so other workers' acknowledgements are picked up; the
+# alert routes drop a key as soon as its alert is acknowledged/resolved here.
+# Keys seen inside a transaction wait in session.info until it commits. The set
+# is shared by request and background-task threads, so it is swapped, not
+# rebuilt in place, under the lock; a reload that overlaps an invalidation is
+# thrown away rather than bring back a key that was just resolved.
+PENDING_ALERTS_CACHE_TTL_SECONDS = 30.0
+_pending_continuous_high: Set[Tuple[int, UtilityType]] = set()
+_pending_continuous_high_expires_at = 0.0
+_pending_continuous_high_generation = 0
+_pending_continuous_high_lock = threading.Lock()
+
+
+def _queue_pending_continuous_high(db: Session, keys: Iterable[Tuple[int, UtilityType]]) -> None:
+    """Remember keys whose alert this transaction wrote or saw; published on commit."""
+    db.info.setdefault("pending_continuous_high_generation", _pending_continuous_high_generation)
+    db.info.setdefault("pending_continuous_high", set()).update(keys)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending_continuous_high(session):
+    generation = session.info.pop("pending_continuous_high_generation", None)
+    keys = session.info.pop("pending_continuous_high", None)
+    if keys:
+        with _pending_continuous_high_lock:
+            # An invalidation since the keys were seen may have resolved one.
+            if generation == _pending_continuous_high_generation:
+                _pending_continuous_high.update(keys)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending_continuous_high(session, previous_transaction):
+    # Unlike cache invalidation, forgetting a key is always safe, so drop them
+    # on savepoint rollbacks too rather than publish an alert that was undone.
+    session.info.pop("pending_continuous_high_generation", None)
+    session.info.pop("pending_continuous_high", None)
+
+
+def invalidate_pending_alerts_cache(
+    building_id: Optional[int] = None,
+    utility_type: Optional[UtilityType] = None,
+) -> None:
+    """Forget one (building, utility) pair, or every cached pending alert if omitted."""
+    global _pending_continuous_high, _pending_continuous_high_expires_at, _pending_continuous_high_generation
+    with _pending_continuous_high_lock:
+        _pending_continuous_high_generation += 1
+        if building_id is None:
+            _pending_continuous_high = set()
+            _pending_continuous_high_expires_at = 0.0
+        else:
+            _pending_continuous_high.discard((building_id, utility_type))
+
+
+def _reload_pending_continuous_high(db: Session) -> None:
+    global _pending_continuous_high, _pending_continuous_high_expires_at
+    with _pending_continuous_high_lock:
+        generation = _pending_continuous_high_generation
+    fresh = set(
+        db.query(Alert.building_id, Alert.utility_type).filter(
+            and_(
+                Alert.alert_type == AlertType.CONTINUOUS_HIGH,
+                Alert.status == AlertStatus.PENDING,
+            )
+        ).distinct().all()
+    )
+    # This transaction's own alerts are visible here but not yet committed.
+    fresh.difference_update(db.info.get("pending_continuous_high", ()))
+    with _pending_continuous_high_lock:
+        if generation == _pending_continuous_high_generation:
+            _pending_continuous_high = fresh
+            _pending_continuous_high_expires_at = time.monotonic() + PENDING_ALERTS_CACHE_TTL_SECONDS
+
+
+def _has_pending_continuous_high(db: Session, building_id: int, utility_type: UtilityType) -> bool:
+    if _pending_continuous_high_expires_at <= time.monotonic():
+        _reload_pending_continuous_high(db)
+
+    key = (building_id, utility_type)
+    with _pending_continuous_high_lock:
+        cached = key in _pending_continuous_high
+    if cached or key in db.info.get("pending_continuous_high", ()):
+        return True
+    exists = db.query(Alert.id).filter(
+        and_(
+            Alert.building_id == building_id,
+            Alert.utility_type == utility_type,
+            Alert.alert_type == AlertType.CONTINUOUS_HIGH,
+            Alert.status == AlertStatus.PENDING
+        )
+    ).limit(1).scalar() is not None
+    if exists:
+        _queue_pending_continuous_high(db, [key])
+    return exists
+
+
+def _history_days(active_rules: List[AlertRule]) -> int:
+    """Widest look-back (in days) needed by the built-in checks and the given rules."""
+    return max(
+        [7] + [max(1, int(rule.comparison_window_days or 1)) for rule in active_rules]
+    )
+
+
+def _find_anomalies(
+    db: Session,
+    reading: UtilityReading,
+    building: Building,
+    active_rules: List[AlertRule],
+    history: _History,
+    visible_up_to_id: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Evaluate the built-in checks and admin rules for one reading.
+
+    `history` must hold every earlier reading of the same building/utility from
+    some cutoff date onwards. Returns Alert column mappings; continuous-high
+    and rule alerts still have to be de-duplicated against pending alerts by the caller.
+    When `visible_up_to_id` is set, fallback queries ignore rows inserted after it
+    (used by batch ingestion so later rows of the batch are not visible yet).
+    """
+    alerts_created: List[Dict[str, Any]] = []
+    reading_date = naive_utc(reading.reading_date)
+
+    def within_days(days: int):
+        return history.since(reading_date - timedelta(days=days))
+
+    # window_days -> (count, mean, stdev); the spike check and every zscore rule
+    # with the same window share one pass over the history.
+    window_stats: Dict[int, Tuple[int, float, float]] = {}
+
+    def stats_within_days(days: int) -> Tuple[int, float, float]:
+        if days not in window_stats:
+            window_stats[days] = _mean_stdev(r.value for r in within_days(days))
+        return window_stats[days]
+
+    def visible(query):
+        if visible_up_to_id is not None:
+            query = query.filter(UtilityReading.id <= visible_up_to_id)
+        return query
 
-def check_anomalies(db: Session, reading: UtilityReading):
-    """Check for anomalies in a new reading and create alerts if found"""
-    building = db.query(Building).filter(Building.id == reading.building_id).first()
-    if not building:
-        return
-    
-    alerts_created = []
-    
     # 1. Check threshold breach
     threshold = (
         building.water_threshold if reading.utility_type == UtilityType.WATER
         else building.electricity_threshold
     )
-    
+
     if reading.value > threshold:
-        alert = Alert(
+        alerts_created.append(dict(
             building_id=reading.building_id,
             alert_type=AlertType.THRESHOLD_BREACH,
             utility_type=reading.utility_type,
             message=f"{reading.utility_type.value.capitalize()} consumption ({reading.value:.2f} {reading.unit}) exceeds threshold ({threshold:.2f} {reading.unit})",
             severity="high",
             reading_id=reading.id
-        )
-        db.add(alert)
-        alerts_created.append(alert)
-    
+        ))
+
     # 2. Check for spike (compare with recent readings)
-    recent_readings = db.query(UtilityReading).filter(
-        and_(
-            UtilityReading.building_id == reading.building_id,
-            UtilityReading.utility_type == reading.utility_type,
-            UtilityReading.id != reading.id,
-            UtilityReading.reading_date >= reading.reading_date - timedelta(days=7)
-        )
-    ).all()
-    
-    if len(recent_readings) >= 3:
-        values = [r.value for r in recent_readings]
-        mean = statistics.mean(values)
-        stdev = statistics.stdev(values) if len(values) > 1 else 0
-        
-        if stdev > 0:
-            z_score = (reading.value - mean) / stdev
-            if z_score > 2.5:  # Significant spike
-                alert = Alert(
-                    building_id=reading.building_id,
-                    alert_type=AlertType.SPIKE,
-                    utility_type=reading.utility_type,
-                    message=f"Spike detected: {reading.utility_type.value.capitalize()} consumption ({reading.value:.2f} {reading.unit}) is {z_score:.2f} standard deviations above recent average ({mean:.2f} {reading.unit})",
-                    severity="medium",
-                    reading_id=reading.id
-                )
-                db.add(alert)
-                alerts_created.append(alert)
-    
-    # 3. Check for continuous high usage (last 3+ days above threshold)
-    recent_days = db.query(UtilityReading).filter(
-        and_(
-            UtilityReading.building_id == reading.building_id,
-            UtilityReading.utility_type == reading.utility_type,
-            UtilityReading.reading_date >= reading.reading_date - timedelta(days=3),
-            UtilityReading.value > threshold * 0.8  # 80% of threshold
-        )
-    ).all()
-    
-    if len(recent_days) >= 3:
-        # Check if there's already a pending continuous high alert
-        existing_alert = db.query(Alert).filter(
-            and_(
-                Alert.building_id == reading.building_id,
-                Alert.utility_type == reading.utility_type,
-                Alert.alert_type == AlertType.CONTINUOUS_HIGH,
-                Alert.status == AlertStatus.PENDING
-            )
-        ).first()
-        
-        if not existing_alert:
-            alert = Alert(
+    count, mean, stdev = stats_within_days(7)
+    if count >= 3 and stdev > 0:
+        z_score = (reading.value - mean) / stdev
+        if z_score > 2.5:  # Significant spike
+            alerts_created.append(dict(
                 building_id=reading.building_id,
-                alert_type=AlertType.CONTINUOUS_HIGH,
+                alert_type=AlertType.SPIKE,
                 utility_type=reading.utility_type,
-                message=f"Continuous high {reading.utility_type.value} usage detected: {len(recent_days)} consecutive days above 80% of threshold",
+                message=f"Spike detected: {reading.utility_type.value.capitalize()} consumption ({reading.value:.2f} {reading.unit}) is {z_score:.2f} standard deviations above recent average ({mean:.2f} {reading.unit})",
                 severity="medium",
                 reading_id=reading.id
-            )
-            db.add(alert)
-            alerts_created.append(alert)
+            ))
 
-    # 4. Dynamic rule-based checks (admin-managed rules)
-    active_rules = db.query(AlertRule).filter(
-        and_(
-            AlertRule.is_active == True,  # noqa: E712
-            AlertRule.utility_type == reading.utility_type,
-        )
-    ).all()
+    # 3. Check for continuous high usage (last 3+ days above threshold)
+    high_floor = threshold * 0.8  # 80% of threshold
+    high_days = sum(1 for r in within_days(3) if r.value > high_floor) + (reading.value > high_floor)
+
+    if high_days >= 3:
+        alerts_created.append(dict(
+            building_id=reading.building_id,
+            alert_type=AlertType.CONTINUOUS_HIGH,
+            utility_type=reading.utility_type,
+            message=f"Continuous high {reading.utility_type.value} usage detected: {high_days} consecutive days above 80% of threshold",
+            severity="medium",
+            reading_id=reading.id
+        ))
 
+    # 4. Dynamic rule-based checks (admin-managed rules)
     for rule in active_rules:
         # Scope matching
         if rule.scope_type == "building" and rule.building_id != reading.building_id:
@@ -112,98 +324,272 @@ def check_anomalies(db: Session, reading: UtilityReading):
                 continue
 
         triggered = False
-        reason = ""
         window_days = max(1, int(rule.comparison_window_days or 1))
 
         if rule.condition_type == "threshold":
             threshold_value = float(rule.threshold_value)
             if int(rule.consecutive_count or 1) > 1:
-                recent = db.query(UtilityReading).filter(
-                    and_(
-                        UtilityReading.building_id == reading.building_id,
-                        UtilityReading.utility_type == reading.utility_type,
-                    )
-                ).order_by(UtilityReading.reading_date.desc()).limit(int(rule.consecutive_count)).all()
+                # Last N readings including the new one, newest first.
+                recent = history.newest(int(rule.consecutive_count), reading, reading_date)
+                if len(recent) < int(rule.consecutive_count):
+                    # History window is shorter than the streak; look further back.
+                    recent = visible(db.query(UtilityReading.value).filter(
+                        and_(
+                            UtilityReading.building_id == reading.building_id,
+                            UtilityReading.utility_type == reading.utility_type,
+                        )
+                    )).order_by(UtilityReading.reading_date.desc()).limit(int(rule.consecutive_count)).all()
                 if len(recent) >= int(rule.consecutive_count) and all(r.value > threshold_value for r in recent):
                     triggered = True
-                    reason = f"{len(recent)} consecutive readings above {threshold_value:.2f} {reading.unit}"
             elif reading.value > threshold_value:
                 triggered = True
-                reason = f"value {reading.value:.2f} > threshold {threshold_value:.2f} {reading.unit}"
 
         elif rule.condition_type == "zscore":
-            recent = db.query(UtilityReading).filter(
-                and_(
-                    UtilityReading.building_id == reading.building_id,
-                    UtilityReading.utility_type == reading.utility_type,
-                    UtilityReading.id != reading.id,
-                    UtilityReading.reading_date >= reading.reading_date - timedelta(days=window_days),
-                )
-            ).all()
-            if len(recent) >= 3:
-                values = [r.value for r in recent]
-                mean = statistics.mean(values)
-                stdev = statistics.stdev(values) if len(values) > 1 else 0.0
-                if stdev > 0:
-                    z_score = (reading.value - mean) / stdev
-                    if z_score > float(rule.threshold_value):
-                        triggered = True
-                        reason = f"z-score {z_score:.2f} > {float(rule.threshold_value):.2f}"
+            count, mean, stdev = stats_within_days(window_days)
+            if count >= 3 and stdev > 0:
+                z_score = (reading.value - mean) / stdev
+                if z_score > float(rule.threshold_value):
+                    triggered = True
 
         elif rule.condition_type == "rate_of_change":
-            prev = db.query(UtilityReading).filter(
-                and_(
-                    UtilityReading.building_id == reading.building_id,
-                    UtilityReading.utility_type == reading.utility_type,
-                    UtilityReading.id != reading.id,
-                    UtilityReading.reading_date < reading.reading_date,
-                )
-            ).order_by(UtilityReading.reading_date.desc()).first()
+            prev = history.latest_before(reading_date)
+            if prev is None:
+                # Nothing inside the history window; fall back to the latest older reading.
+                prev = visible(db.query(UtilityReading.value).filter(
+                    and_(
+                        UtilityReading.building_id == reading.building_id,
+                        UtilityReading.utility_type == reading.utility_type,
+                        UtilityReading.id != reading.id,
+                        UtilityReading.reading_date < reading.reading_date,
+                    )
+                )).order_by(UtilityReading.reading_date.desc()).first()
             if prev and prev.value > 0:
                 pct = ((reading.value - prev.value) / prev.value) * 100.0
                 if pct > float(rule.threshold_value):
                     triggered = True
-                    reason = f"rate-of-change {pct:.2f}% > {float(rule.threshold_value):.2f}%"
 
         if not triggered:
             continue
 
-        # Avoid duplicate pending rule alerts for the same reading
-        existing = db.query(Alert).filter(
-            and_(
-                Alert.reading_id == reading.id,
-                Alert.alert_type == AlertType.RULE_TRIGGER,
-                Alert.status == AlertStatus.PENDING,
-            )
-        ).first()
-        if existing:
-            continue
-
-        utility_label = reading.utility_type.value.capitalize()
-        if rule.condition_type == "threshold":
-            friendly_message = (
-                f"{utility_label} reading {reading.value:.2f} {reading.unit} exceeded configured limit "
-                f"{float(rule.threshold_value):.2f} {reading.unit}."
-            )
-        elif rule.condition_type == "zscore":
-            friendly_message = (
-                f"{utility_label} reading {reading.value:.2f} {reading.unit} deviated significantly from recent pattern."
-            )
-        else:
-            friendly_message = (
-                f"{utility_label} usage changed too quickly compared to previous readings."
-            )
+        friendly_message = _RULE_MESSAGES[rule.condition_type](
+            utility=reading.utility_type.value.capitalize(),
+            value=reading.value,
+            unit=reading.unit,
+            limit=float(rule.threshold_value),
+        )
 
-        dynamic_alert = Alert(
+        alerts_created.append(dict(
             building_id=reading.building_id,
             alert_type=AlertType.RULE_TRIGGER,
             utility_type=reading.utility_type,
             message=friendly_message,
             severity=rule.severity or "medium",
             reading_id=reading.id,
+        ))
+
+    return alerts_created
+
+
+def check_anomalies(db: Session, reading: UtilityReading, building: Optional[Building] = None):
+    """
+    Check for anomalies in a new reading and create alerts if found.
+
+    Callers that already hold the reading's building should pass it to skip the lookup.
+    """
+    if building is None:
+        building = db.get(Building, reading.building_id)
+    if not building:
+        return
+
+    active_rules = _get_active_rules(db, reading.utility_type)
+
+    # Pre-fetch the recent history for this building/utility once; the built-in
+    # checks and every rule slice this list instead of issuing their own SELECT.
+    history = db.query(*_HISTORY_COLUMNS).filter(
+        and_(
+            UtilityReading.building_id == reading.building_id,
+            UtilityReading.utility_type == reading.utility_type,
+            UtilityReading.id != reading.id,
+            UtilityReading.reading_date >= reading.reading_date - timedelta(days=_history_days(active_rules)),
+        )
+    ).order_by(UtilityReading.reading_date.desc()).all()
+
+    alert_rows: List[Dict[str, Any]] = []
+    existing_rule_alert = None
+    for values in _find_anomalies(db, reading, building, active_rules, _History(reversed(history))):
+        if values["alert_type"] == AlertType.CONTINUOUS_HIGH:
+            # Check if there's already a pending continuous high alert
+            if _has_pending_continuous_high(db, reading.building_id, reading.utility_type):
+                continue
+            _queue_pending_continuous_high(db, [(reading.building_id, reading.utility_type)])
+        elif values["alert_type"] == AlertType.RULE_TRIGGER:
+            # Avoid duplicate pending rule alerts for the same reading (checked once per reading)
+            if existing_rule_alert is None:
+                existing_rule_alert = db.query(Alert.id).filter(
+                    and_(
+                        Alert.reading_id == reading.id,
+                        Alert.alert_type == AlertType.RULE_TRIGGER,
+                        Alert.status == AlertStatus.PENDING,
+                    )
+                ).limit(1).scalar() is not None
+            if existing_rule_alert:
+                continue
+
+        alert_rows.append(values)
+
+    # Alerts are write-only here; a Core executemany skips the unit of work.
+    if alert_rows:
+        db.execute(insert(Alert), alert_rows)
+
+
+def run_anomaly_check(reading_id: int) -> None:
+    """
+    Background-task entry point: run `check_anomalies` for a committed reading.
+
+    Uses its own session because it runs after the request's session is closed.
+    """
+    db = SessionLocal()
+    try:
+        reading = (
+            db.query(UtilityReading)
+            .options(joinedload(UtilityReading.building))
+            .filter(UtilityReading.id == reading_id)
+            .first()
+        )
+        if reading is None:
+            return
+        check_anomalies(db, reading, building=reading.building)
+        db.commit()
+    except Exception:  # noqa: BLE001
+        db.rollback()
+        logger.exception("[ANOMALY] Deferred check failed for reading_id=%s", reading_id)
+    finally:
+        db.close()
+
+
+def run_anomaly_check_bulk(reading_ids: List[int]) -> None:
+    """
+    Background-task entry point: run `check_anomalies_bulk` for committed readings.
+
+    Uses its own session because it runs after the request's session is closed.
+    """
+    db = SessionLocal()
+    try:
+        readings = db.query(UtilityReading).filter(UtilityReading.id.in_(reading_ids)).all()
+        if not readings:
+            return
+        check_anomalies_bulk(db, readings)
+        db.commit()
+    except Exception:  # noqa: BLE001
+        db.rollback()
+        logger.exception("[ANOMALY] Deferred bulk check failed for %d readings", len(reading_ids))
+    finally:
+        db.close()
+
+
+def check_anomalies_bulk(
+    db: Session,
+    readings: List[UtilityReading],
+    buildings: Optional[Dict[int, Building]] = None,
+) -> int:
+    """
+    Run `check_anomalies` semantics over a batch of freshly-flushed readings.
+
+    Buildings, recent history and pending alerts are loaded with one query each (rules
+    come from the in-process rules cache) instead of once per reading. Readings are
+    evaluated in insertion (id) order and each one only sees the batch rows inserted
+    before it, matching row-by-row ingestion.
+    Returns the number of alerts created.
+    """
+    if not readings:
+        return 0
+    readings = sorted(readings, key=lambda r: r.id)
+
+    building_ids = {r.building_id for r in readings}
+    utility_types = {r.utility_type for r in readings}
+    if buildings is None:
+        buildings = {
+            b.id: b for b in db.query(Building).filter(Building.id.in_(building_ids)).all()
+        }
+
+    rules_by_utility = {
+        utility_type: _get_active_rules(db, utility_type) for utility_type in utility_types
+    }
+
+    # One windowed history query covering every (building, utility) pair in the batch;
+    # grouping is done in Python since the IN lists form a superset of the pairs.
+    # Rows are kept in id order and fed into each pair's date-sorted history as
+    # the id-ordered batch walks past them, so every row is added exactly once.
+    earliest = min(readings, key=lambda r: naive_utc(r.reading_date)).reading_date
+    history_days = max(_history_days(rules) for rules in rules_by_utility.values())
+    rows_by_key: Dict[tuple, List[Any]] = {}
+    for row in db.query(*_HISTORY_COLUMNS).filter(
+        and_(
+            UtilityReading.building_id.in_(building_ids),
+            UtilityReading.utility_type.in_(utility_types),
+            UtilityReading.reading_date >= earliest - timedelta(days=history_days),
         )
-        db.add(dynamic_alert)
-        alerts_created.append(dynamic_alert)
-    
-    if alerts_created:
-        db.flush()
+    ).order_by(UtilityReading.id).all():
+        rows_by_key.setdefault((row.building_id, row.utility_type), []).append(row)
+    histories: Dict[tuple, _History] = {}
+    next_row: Dict[tuple, int] = {}
+
+    pending_continuous = {
+        (building_id, utility_type)
+        for building_id, utility_type in db.query(Alert.building_id, Alert.utility_type).filter(
+            and_(
+                Alert.building_id.in_(building_ids),
+                Alert.alert_type == AlertType.CONTINUOUS_HIGH,
+                Alert.status == AlertStatus.PENDING,
+            )
+        ).all()
+    }
+    pending_rule_readings = {
+        reading_id
+        for (reading_id,) in db.query(Alert.reading_id).filter(
+            and_(
+                Alert.reading_id.in_([r.id for r in readings]),
+                Alert.alert_type == AlertType.RULE_TRIGGER,
+                Alert.status == AlertStatus.PENDING,
+            )
+        ).all()
+    }
+
+    alert_rows: List[Dict[str, Any]] = []
+    for reading in readings:
+        building = buildings.get(reading.building_id)
+        if not building:
+            continue
+        key = (reading.building_id, reading.utility_type)
+        history = histories.setdefault(key, _History())
+        rows = rows_by_key.get(key, ())
+        index = next_row.get(key, 0)
+        while index < len(rows) and rows[index].id < reading.id:
+            history.add(rows[index])
+            index += 1
+        next_row[key] = index
+        for values in _find_anomalies(
+            db,
+            reading,
+            building,
+            rules_by_utility.get(reading.utility_type, []),
+            history,
+            visible_up_to_id=reading.id,
+        ):
+            if values["alert_type"] == AlertType.CONTINUOUS_HIGH:
+                if key in pending_continuous:
+                    continue
+                pending_continuous.add(key)
+            elif values["alert_type"] == AlertType.RULE_TRIGGER:
+                if reading.id in pending_rule_readings:
+                    continue
+            alert_rows.append(values)
+
+    if alert_rows:
+        db.execute(insert(Alert), alert_rows)
+        _queue_pending_continuous_high(db, [
+            (values["building_id"], values["utility_type"])
+            for values in alert_rows
+            if values["alert_type"] == AlertType.CONTINUOUS_HIGH
+        ])
+    return len(alert_rows)
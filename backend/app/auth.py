@@ -1,12 +1,17 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
 import logging
+import threading
+import time
 
-from jose import JWTError, jwt
 import bcrypt
+import jwt
+from jwt import ExpiredSignatureError, InvalidTokenError
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
 
 from app.config import settings
 from app.database import get_db
@@ -14,10 +19,12 @@ from app.models import User, UserRole
 from app.schemas import TokenData
 
 # -------------------------------------------------------------------
-# Logging (TEMP DEBUG – DO NOT REMOVE UNTIL SYSTEM IS STABLE)
+# Logging
 # -------------------------------------------------------------------
+# Per-request auth tracing is emitted at DEBUG with lazy %-style args so
+# nothing is formatted unless DEBUG is enabled for the "auth" logger.
+# Handler/level setup lives in main.py, not at import time.
 logger = logging.getLogger("auth")
-logging.basicConfig(level=logging.INFO)
 
 # -------------------------------------------------------------------
 # OAuth2 scheme
@@ -34,7 +41,7 @@ def get_password_hash(password: str) -> str:
     This is intentionally NOT passlib-based to remain DB-compatible.
     """
     password_bytes = password.encode("utf-8")
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.bcrypt_rounds)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode("utf-8")
 
@@ -49,7 +56,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
             hashed_password.encode("utf-8")
         )
     except Exception as e:
-        logger.error(f"[AUTH] Password verification failed: {e}")
+        logger.error("[AUTH] Password verification failed: %s", e)
         return False
 
 
@@ -84,18 +91,69 @@ def create_access_token(
         algorithm=settings.algorithm
     )
 
-    logger.info(
-        "[AUTH] Access token created",
-        extra={
-            "sub": data.get("sub"),
-            "role": data.get("role"),
-            "expires_at": expire.isoformat() + "Z",
-        },
+    logger.debug(
+        "[AUTH] Access token created sub=%s role=%s expires_at=%s",
+        data.get("sub"),
+        data.get("role"),
+        expire,
     )
 
     return encoded_jwt
 
 
+# -------------------------------------------------------------------
+# Per-process caches for the authenticated request path
+# -------------------------------------------------------------------
+# A bearer token is re-sent unchanged on every request, so its decoded
+# claims are memoised. Expiry is re-checked on every hit because a cached
+# entry can outlive the token.
+@lru_cache(maxsize=4096)
+def decode_token(token: str) -> Tuple[Optional[str], Optional[str], Optional[int]]:
+    payload = jwt.decode(
+        token,
+        settings.secret_key,
+        algorithms=[settings.algorithm]
+    )
+    return payload.get("sub"), payload.get("role"), payload.get("exp")
+
+
+# email -> (expires_at, detached User snapshot). Short TTL bounds how long a
+# role/is_active change takes to be seen; use invalidate_user_cache() to
+# drop an entry immediately.
+USER_CACHE_TTL_SECONDS = 60
+USER_CACHE_MAX_SIZE = 4096
+_user_cache: Dict[str, Tuple[float, User]] = {}
+# Sync dependencies run in the threadpool; eviction iterates the dict.
+_user_cache_lock = threading.Lock()
+
+
+def invalidate_user_cache(email: Optional[str] = None) -> None:
+    """Forget the cached user for `email` (or every cached user if omitted)."""
+    with _user_cache_lock:
+        if email is None:
+            _user_cache.clear()
+        else:
+            _user_cache.pop(email, None)
+
+
+def get_user_by_email(db: Session, email: str) -> Optional[User]:
+    with _user_cache_lock:
+        cached = _user_cache.get(email)
+    if cached and cached[0] > time.monotonic():
+        # Attach a copy of the snapshot to this session without a SELECT.
+        return db.merge(cached[1], load=False)
+
+    user = db.query(User).filter(User.email == email).first()
+    if user is not None:
+        snapshot = User(**{attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs})
+        make_transient_to_detached(snapshot)
+        with _user_cache_lock:
+            if email not in _user_cache and len(_user_cache) >= USER_CACHE_MAX_SIZE:
+                _user_cache.pop(next(iter(_user_cache)))
+            _user_cache[email] = (time.monotonic() + USER_CACHE_TTL_SECONDS, snapshot)
+    return user
+
+
 # -------------------------------------------------------------------
 # Core dependency: get current user from JWT
 # -------------------------------------------------------------------
@@ -113,53 +171,39 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    logger.info("[AUTH] Incoming request – validating JWT")
+    logger.debug("[AUTH] Incoming request – validating JWT")
 
     try:
-        payload = jwt.decode(
-            token,
-            settings.secret_key,
-            algorithms=[settings.algorithm]
-        )
-
-        email: Optional[str] = payload.get("sub")
-        role: Optional[str] = payload.get("role")
-        exp: Optional[int] = payload.get("exp")
+        email, role, exp = decode_token(token)
+        if exp is not None and exp <= time.time():
+            raise ExpiredSignatureError("Signature has expired")
 
         if email is None:
             logger.warning("[AUTH] Token missing 'sub'")
             raise credentials_exception
 
-        logger.info(
-            "[AUTH] Token decoded successfully",
-            extra={
-                "email": email,
-                "role": role,
-                "exp": exp,
-            },
+        logger.debug(
+            "[AUTH] Token decoded successfully email=%s role=%s exp=%s",
+            email,
+            role,
+            exp,
         )
 
         token_data = TokenData(email=email)
 
-    except JWTError as e:
-        logger.error(f"[AUTH] JWT decode failed: {e}")
+    except InvalidTokenError as e:
+        logger.error("[AUTH] JWT decode failed: %s", e)
         raise credentials_exception
 
-    user = db.query(User).filter(User.email == token_data.email).first()
+    user = get_user_by_email(db, token_data.email)
 
     if user is None:
         logger.warning(
-            f"[AUTH] No user found for email={token_data.email}"
+            "[AUTH] No user found for email=%s", token_data.email
         )
         raise credentials_exception
 
-    logger.info(
-        "[AUTH] Authenticated user",
-        extra={
-            "email": user.email,
-            "role": user.role.value if hasattr(user.role, "value") else str(user.role),
-        },
-    )
+    logger.debug("[AUTH] Authenticated user email=%s role=%s", user.email, user.role)
 
     return user
 
@@ -172,7 +216,7 @@ async def get_current_active_user(
 ) -> User:
     if not current_user.is_active:
         logger.warning(
-            f"[AUTH] Inactive user attempted access: {current_user.email}"
+            "[AUTH] Inactive user attempted access: %s", current_user.email
         )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -189,16 +233,17 @@ async def get_current_admin_user(
 ) -> User:
     if current_user.role != UserRole.ADMIN:
         logger.warning(
-            f"[AUTH] Forbidden admin access attempt by "
-            f"user={current_user.email}, role={current_user.role}"
+            "[AUTH] Forbidden admin access attempt by user=%s, role=%s",
+            current_user.email,
+            current_user.role,
         )
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
         )
 
-    logger.info(
-        f"[AUTH] Admin access granted to user={current_user.email}"
+    logger.debug(
+        "[AUTH] Admin access granted to user=%s", current_user.email
     )
 
     return current_user
\ No newline at end of file
@@ -1,4 +1,6 @@
-from pydantic_settings import BaseSettings
+from functools import lru_cache
+from pydantic import Field, field_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import Optional
 import os
 
@@ -10,18 +12,35 @@ class Settings(BaseSettings):
     debug: bool = True
     # Optional API key for IoT ingestion
     iot_api_key: Optional[str] = None
+    # bcrypt cost for new password hashes; existing hashes keep their own cost
+    bcrypt_rounds: int = Field(default=12, ge=4, le=31)
+    # Connection pool for server databases (ignored for SQLite)
+    db_pool_size: int = Field(default=20, ge=1)
+    db_max_overflow: int = Field(default=20, ge=0)
+    db_pool_recycle_seconds: int = 1800
+    # Worker threads for sync request handlers; keep near pool size + overflow
+    threadpool_size: int = Field(default=40, ge=1)
+    # Create missing tables and backfill rollups at startup; turn off where
+    # init_db.py runs as a deploy step
+    auto_create_tables: bool = True
 
-    class Config:
-        env_file = ".env"
-        # Allow reading from environment variables
-        case_sensitive = False
+    # Allow reading from environment variables; settings are read-only once loaded
+    model_config = SettingsConfigDict(env_file=".env", case_sensitive=False, frozen=True)
 
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        # Use SQLite if DATABASE_URL is not set or if it's the default PostgreSQL URL
-        # Check self.database_url (loaded by Pydantic from .env) instead of os.getenv
-        # because Pydantic loads from .env without updating os.environ
-        if not self.database_url or self.database_url.startswith("postgresql://postgres:postgres"):
-            self.database_url = "sqlite:///./smartcampus.db"
+    @field_validator("database_url")
+    @classmethod
+    def _sqlite_fallback(cls, value: str) -> str:
+        # Use SQLite if DATABASE_URL is empty or if it's the default PostgreSQL URL
+        # (validated on the value Pydantic loaded from env/.env, not os.environ)
+        if not value or value.startswith("postgresql://postgres:postgres"):
+            return "sqlite:///./smartcampus.db"
+        return value
 
-settings = Settings()
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Process-wide settings; `.env` is parsed once. Usable as a FastAPI dependency."""
+    return Settings()
+
+
+settings = get_settings()
@@ -6,15 +6,34 @@ from app.config import settings
 
 # SQLite requires check_same_thread=False for async operations
 connect_args = {}
+engine_options = {}
 if settings.database_url.startswith("sqlite"):
     connect_args = {"check_same_thread": False}
+else:
+    if settings.database_url.startswith("postgresql"):
+        # Timestamps are timestamptz, but the app binds naive UTC bounds and
+        # buckets days with date_trunc; both follow the session TimeZone, so
+        # pin it to UTC instead of inheriting the server's setting.
+        connect_args = {"options": "-c timezone=UTC"}
+    # Server databases: keep enough warm connections for request handlers plus
+    # background anomaly checks, drop connections the server has closed, and
+    # recycle them before server/proxy idle timeouts do.
+    engine_options = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_pre_ping": True,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+    }
 
 engine = create_engine(
     settings.database_url,
     connect_args=connect_args,
-    echo=settings.debug
+    echo=settings.debug,
+    **engine_options,
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Objects keep their loaded state after commit, so handlers can return what they
+# just wrote without a refresh SELECT; server defaults come back via RETURNING.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 Base = declarative_base()
 
@@ -1,36 +1,40 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 
 import pandas as pd
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 
-from app.anomaly_detection import check_anomalies
+from app.anomaly_detection import check_anomalies, check_anomalies_bulk
 from app.models import Building, UtilityReading, UtilityType
 from app.schemas import ReadingCreate
 
 
+UTILITY_ALIASES = {
+    "water": UtilityType.WATER,
+    "w": UtilityType.WATER,
+    "electricity": UtilityType.ELECTRICITY,
+    "electric": UtilityType.ELECTRICITY,
+    "power": UtilityType.ELECTRICITY,
+    "e": UtilityType.ELECTRICITY,
+}
+
+
 def parse_import_timestamp(raw_timestamp: object) -> datetime:
     try:
         ts = pd.to_datetime(raw_timestamp, utc=True)
     except Exception as exc:  # noqa: BLE001
         raise ValueError(f"invalid timestamp: {raw_timestamp!r}") from exc
+    if pd.isna(ts):
+        raise ValueError(f"invalid timestamp: {raw_timestamp!r}")
     return ts.to_pydatetime()
 
 
 def parse_import_utility(raw_utility: object) -> UtilityType:
-    label = str(raw_utility or "").strip().lower()
-    aliases = {
-        "water": UtilityType.WATER,
-        "w": UtilityType.WATER,
-        "electricity": UtilityType.ELECTRICITY,
-        "electric": UtilityType.ELECTRICITY,
-        "power": UtilityType.ELECTRICITY,
-        "e": UtilityType.ELECTRICITY,
-    }
-    utility = aliases.get(label)
+    label = (raw_utility if isinstance(raw_utility, str) else str(raw_utility or "")).strip().lower()
+    utility = UTILITY_ALIASES.get(label)
     if not utility:
         raise ValueError(f"invalid utility: {label!r}")
     return utility
@@ -41,31 +45,127 @@ def parse_import_value(raw_value: object) -> float:
         value = float(raw_value)
     except Exception as exc:  # noqa: BLE001
         raise ValueError(f"invalid value: {raw_value!r}") from exc
+    if value != value:  # NaN, e.g. an empty cell
+        raise ValueError(f"invalid value: {raw_value!r}")
     if value < 0:
         raise ValueError("value must be >= 0")
     return value
 
 
-def resolve_building_for_import(db: Session, building_label: str, created_by: int) -> Building:
+def parse_import_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Vectorised parse of an import file's timestamp/utility/value columns.
+
+    Returns a frame (same index as `df`) with `building`, `reading_date`,
+    `utility_type`, `value` and `error` columns. `error` holds the first failure
+    for the row (missing when the row is valid), checked in the same order and with the same messages as the
+    per-value `parse_import_*` helpers; those helpers are only re-run for rows the
+    vectorised pass could not parse.
+    """
+    errors = pd.Series(None, index=df.index, dtype=object)
+    errors[df["building"].isna()] = "building is empty"
+
+    def fallback(column: pd.Series, raw: pd.Series, parse) -> None:
+        for idx in column.index[column.isna() & errors.isna()]:
+            try:
+                column[idx] = parse(raw[idx])
+            except ValueError as exc:
+                errors[idx] = str(exc)
+
+    timestamps = pd.to_datetime(df["timestamp"], utc=True, errors="coerce", format="mixed")
+    fallback(timestamps, df["timestamp"], parse_import_timestamp)
+
+    # Utility columns hold a handful of distinct labels; normalise each one once.
+    raw_utilities = df["utility"].astype(str)
+    utilities = raw_utilities.map(
+        {label: UTILITY_ALIASES.get(str(label).strip().lower()) for label in raw_utilities.unique()}
+    ).astype(object)
+    fallback(utilities, df["utility"], parse_import_utility)
+
+    values = pd.to_numeric(df["value"], errors="coerce").astype(float)
+    fallback(values, df["value"], parse_import_value)
+    errors[(values < 0) & errors.isna()] = "value must be >= 0"
+
+    return pd.DataFrame(
+        {
+            "building": df["building"],
+            "reading_date": timestamps,
+            "utility_type": utilities,
+            "value": values,
+            "error": errors,
+        },
+        index=df.index,
+    )
+
+
+def prefetch_import_buildings(db: Session, building_labels) -> Dict[str, Optional[Building]]:
+    """
+    Resolve many import labels (building code or name) with a single query.
+
+    Returns a cache for `resolve_building_for_import`: every label maps to its
+    building, or to None when no building matches yet. Code matches win over
+    name matches.
+    """
+    labels = {(label or "").strip() for label in building_labels} - {""}
+    cache: Dict[str, Optional[Building]] = dict.fromkeys(labels)
+    if not labels:
+        return cache
+    matches = (
+        db.query(Building)
+        .filter(Building.code.in_(labels) | Building.name.in_(labels))
+        .order_by(Building.id.asc())
+        .all()
+    )
+    for building in matches:
+        if building.name in cache and cache[building.name] is None:
+            cache[building.name] = building
+    for building in matches:
+        if building.code in cache:
+            cache[building.code] = building
+    return cache
+
+
+def resolve_building_for_import(
+    db: Session,
+    building_label: str,
+    created_by: int,
+    cache: Optional[Dict[str, Optional[Building]]] = None,
+) -> Building:
+    """
+    Find the building an import row refers to, creating it if needed.
+
+    `cache` (see `prefetch_import_buildings`) is consulted before querying and is
+    updated with the result, so repeated labels in one file cost no extra SELECTs.
+    """
     normalized = (building_label or "").strip()
     if not normalized or normalized.lower() in {"nan", "none", "null", "na", "n/a"}:
         raise ValueError("building is empty")
 
-    building = (
-        db.query(Building)
-        .filter(
-            (Building.code == normalized)
-            | (Building.name == normalized)
+    if cache is not None and normalized in cache:
+        building = cache[normalized]
+    else:
+        building = (
+            db.query(Building)
+            .filter(
+                (Building.code == normalized)
+                | (Building.name == normalized)
+            )
+            .first()
         )
-        .first()
-    )
     if building:
+        if cache is not None:
+            cache[normalized] = building
         return building
 
     base_code = "".join(ch for ch in normalized.upper() if ch.isalnum() or ch == "-")[:16] or "BLDG"
+    # Every candidate code shares the first 14 characters; fetch them all at once.
+    taken = {
+        code
+        for (code,) in db.query(Building.code).filter(Building.code.like(f"{base_code[:14]}%")).all()
+    }
     code = base_code
     suffix = 1
-    while db.query(Building).filter(Building.code == code).first():
+    while code in taken:
         suffix += 1
         code = f"{base_code[:14]}{suffix:02d}"[:16]
 
@@ -78,6 +178,8 @@ def resolve_building_for_import(db: Session, building_label: str, created_by: in
     )
     db.add(building)
     db.flush()
+    if cache is not None:
+        cache[normalized] = building
     return building
 
 
@@ -86,8 +188,15 @@ def create_reading_from_payload(
     payload: ReadingCreate,
     recorded_by: int,
     notes: Optional[str] = None,
+    detect_anomalies: bool = True,
 ) -> UtilityReading:
-    building = db.query(Building).filter(Building.id == payload.building_id).first()
+    """
+    Create a reading from a validated payload and flush it.
+
+    Pass `detect_anomalies=False` when the caller schedules the anomaly check
+    itself (e.g. as a background task after commit).
+    """
+    building = db.get(Building, payload.building_id)
     if not building:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -106,5 +215,49 @@ def create_reading_from_payload(
     )
     db.add(db_reading)
     db.flush()
-    check_anomalies(db, db_reading)
+    if detect_anomalies:
+        check_anomalies(db, db_reading, building=building)
     return db_reading
+
+
+def create_readings_bulk(
+    db: Session,
+    payloads: List[ReadingCreate],
+    recorded_by: int,
+    notes: Optional[str] = None,
+) -> List[UtilityReading]:
+    """
+    Insert many readings in one flush and run anomaly detection over the batch.
+
+    Equivalent to calling `create_reading_from_payload` per payload, but with a
+    fixed number of queries instead of several per row.
+    """
+    if not payloads:
+        return []
+
+    building_ids = {payload.building_id for payload in payloads}
+    buildings = {
+        b.id: b for b in db.query(Building).filter(Building.id.in_(building_ids)).all()
+    }
+    if len(buildings) != len(building_ids):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Building not found",
+        )
+
+    db_readings = []
+    for payload in payloads:
+        payload_data = payload.model_dump()
+        payload_data.pop("notes", None)
+        db_readings.append(
+            UtilityReading(
+                **payload_data,
+                unit="liters" if payload.utility_type == UtilityType.WATER else "kWh",
+                recorded_by=recorded_by,
+                notes=notes if notes is not None else payload.notes,
+            )
+        )
+    db.add_all(db_readings)
+    db.flush()
+    check_anomalies_bulk(db, db_readings, buildings=buildings)
+    return db_readings
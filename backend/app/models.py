@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Boolean, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -90,6 +90,38 @@ class UtilityReading(Base):
     building = relationship("Building", back_populates="readings")
     recorded_by_user = relationship("User")
 
+    __table_args__ = (
+        # Anomaly detection: per building/utility history, newest first
+        Index("ix_readings_bldg_type_date", "building_id", "utility_type", "reading_date"),
+        # Reading lists / building overview: per building over a date range,
+        # newest first; covers the per-utility SUM(value) on PostgreSQL
+        Index(
+            "ix_readings_bldg_date_util",
+            "building_id",
+            "reading_date",
+            "utility_type",
+            postgresql_include=["value"],
+        ),
+        # Analytics: per utility over a date range; covers SUM(value) on PostgreSQL
+        Index(
+            "ix_readings_type_date_bldg",
+            "utility_type",
+            "reading_date",
+            "building_id",
+            postgresql_include=["value"],
+        ),
+    )
+
+class UtilityDailyTotal(Base):
+    """Per-day rollup of utility_readings, kept in step by app.rollups."""
+    __tablename__ = "utility_daily_totals"
+
+    day = Column(Date, primary_key=True)
+    building_id = Column(Integer, ForeignKey("buildings.id"), primary_key=True)
+    utility_type = Column(SQLEnum(UtilityType), primary_key=True)
+    sum_value = Column(Float, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
+
 class Alert(Base):
     __tablename__ = "alerts"
 
@@ -114,6 +146,13 @@ class Alert(Base):
     acknowledged_by_user = relationship("User", foreign_keys=[acknowledged_by])
     resolved_by_user = relationship("User", foreign_keys=[resolved_by])
 
+    __table_args__ = (
+        # Pending-alert de-duplication lookups
+        Index("ix_alerts_bldg_type_status", "building_id", "utility_type", "status"),
+        # Reports: alerts raised in a period, split by alert type
+        Index("ix_alerts_created_type", "created_at", "alert_type"),
+    )
+
 
 class IoTDevice(Base):
     __tablename__ = "iot_devices"
@@ -154,5 +193,13 @@ class AlertRule(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    # Fetch updated_at with RETURNING on UPDATE too, not only on INSERT.
+    __mapper_args__ = {"eager_defaults": True}
+
     building = relationship("Building")
     created_by_user = relationship("User")
+
+
+# Registers the flush hooks that keep utility_daily_totals in step with
+# utility_readings for every session that writes readings.
+from app import rollups  # noqa: E402,F401
@@ -0,0 +1,164 @@
+"""
+Daily rollup of utility readings (`utility_daily_totals`).
+
+Each row holds the sum and count of one building's readings of one utility on
+one day, so range aggregates over whole days read a row per day instead of
+every reading. Affected days are recomputed from utility_readings
+inside the flush that changes them, so the rollup commits (or rolls back) with
+the readings. Days are UTC calendar days, the same ones the /summary buckets
+use: SQLite stores naive UTC and PostgreSQL sessions are pinned to UTC (see
+app.database), so range bounds are compared in naive UTC (`naive_utc`).
+
+Bulk `Query.delete()`/`update()` calls bypass the ORM flush; code that removes
+readings that way must also remove the matching rollup rows.
+"""
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import Date, cast, delete, event, exists, func, insert, inspect, select
+from sqlalchemy.orm import Session
+
+from app.models import UtilityDailyTotal, UtilityReading, UtilityType
+
+# (building_id, utility_type) -> (first day, last day) touched by a flush
+Spans = Dict[Tuple[int, UtilityType], Tuple[date, date]]
+
+_ROLLUP_COLUMNS = ("day", "building_id", "utility_type", "sum_value", "count")
+
+
+def day_expression(dialect_name: str):
+    """SQL expression for the UTC calendar day of a reading."""
+    column = UtilityReading.reading_date
+    if dialect_name == "sqlite":
+        return func.date(column, type_=Date)
+    return cast(func.date_trunc("day", column), Date)
+
+
+def _rollup_select(dialect_name: str):
+    day = day_expression(dialect_name)
+    return (
+        select(
+            day,
+            UtilityReading.building_id,
+            UtilityReading.utility_type,
+            func.sum(UtilityReading.value),
+            func.count(UtilityReading.id),
+        )
+        .group_by(day, UtilityReading.building_id, UtilityReading.utility_type)
+    )
+
+
+def refresh_daily_totals(connection, spans: Spans) -> None:
+    """Recompute the rollup rows for every day in `spans` from utility_readings."""
+    dialect_name = connection.dialect.name
+    for (building_id, utility_type), (first_day, last_day) in spans.items():
+        # Widen by a day each side so readings whose database-side date differs
+        # from their Python date (time zone conversion) are still covered.
+        first_day -= timedelta(days=1)
+        last_day += timedelta(days=1)
+        connection.execute(
+            delete(UtilityDailyTotal).where(
+                UtilityDailyTotal.building_id == building_id,
+                UtilityDailyTotal.utility_type == utility_type,
+                UtilityDailyTotal.day >= first_day,
+                UtilityDailyTotal.day <= last_day,
+            )
+        )
+        connection.execute(
+            insert(UtilityDailyTotal).from_select(
+                _ROLLUP_COLUMNS,
+                _rollup_select(dialect_name).where(
+                    UtilityReading.building_id == building_id,
+                    UtilityReading.utility_type == utility_type,
+                    UtilityReading.reading_date >= datetime.combine(first_day, time.min),
+                    UtilityReading.reading_date < datetime.combine(last_day + timedelta(days=1), time.min),
+                ),
+            )
+        )
+
+
+def rebuild_daily_totals(connection) -> None:
+    """Rebuild the whole rollup from utility_readings."""
+    connection.execute(delete(UtilityDailyTotal))
+    connection.execute(
+        insert(UtilityDailyTotal).from_select(
+            _ROLLUP_COLUMNS, _rollup_select(connection.dialect.name)
+        )
+    )
+
+
+def ensure_daily_totals(engine) -> None:
+    """Backfill the rollup when it is empty but readings exist (e.g. after an upgrade)."""
+    with engine.begin() as connection:
+        has_totals = connection.execute(select(exists().select_from(UtilityDailyTotal))).scalar()
+        has_readings = connection.execute(select(exists().select_from(UtilityReading))).scalar()
+        if has_readings and not has_totals:
+            rebuild_daily_totals(connection)
+
+
+def naive_utc(value: datetime) -> datetime:
+    """Normalise to naive UTC so DB-loaded and freshly-built datetimes compare safely."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def full_days(start: datetime, end: datetime) -> Optional[Tuple[datetime, datetime]]:
+    """
+    Midnights bounding the whole days inside `start <= reading_date <= end`.
+
+    Returns naive UTC (first, stop): every day from `first` up to (not
+    including) `stop` lies entirely in the range, so it can be read from the
+    rollup; readings before `first` or from `stop` on must come from
+    utility_readings. None when the range contains no whole day. Either bound
+    may be naive (taken as UTC) or time zone aware.
+    """
+    start, end = naive_utc(start), naive_utc(end)
+    first = datetime.combine(start.date(), time.min)
+    if first < start:
+        first += timedelta(days=1)
+    stop = datetime.combine(end.date(), time.min)
+    if first >= stop:
+        return None
+    return first, stop
+
+
+def _extend(spans: Spans, building_id, utility_type, reading_date) -> None:
+    if building_id is None or utility_type is None or reading_date is None:
+        return
+    day = reading_date.date()
+    key = (building_id, UtilityType(utility_type))
+    first, last = spans.get(key, (day, day))
+    spans[key] = (min(first, day), max(last, day))
+
+
+_TRACKED_ATTRS = ("building_id", "utility_type", "reading_date", "value")
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_rollup_spans(session, flush_context, instances):
+    spans: Spans = session.info.setdefault("rollup_spans", {})
+    for obj in (*session.new, *session.deleted):
+        if isinstance(obj, UtilityReading):
+            _extend(spans, obj.building_id, obj.utility_type, obj.reading_date)
+    for obj in session.dirty:
+        if not isinstance(obj, UtilityReading):
+            continue
+        attrs = inspect(obj).attrs
+        histories = [attrs[name].history for name in _TRACKED_ATTRS]
+        if not any(history.has_changes() for history in histories):
+            continue
+        # Both the day the reading moved out of and the day it moved into.
+        _extend(spans, obj.building_id, obj.utility_type, obj.reading_date)
+        old = [
+            history.deleted[0] if history.deleted else getattr(obj, name)
+            for name, history in zip(_TRACKED_ATTRS, histories)
+        ]
+        _extend(spans, *old[:3])
+
+
+@event.listens_for(Session, "after_flush")
+def _refresh_rollup_after_flush(session, flush_context):
+    spans = session.info.pop("rollup_spans", None)
+    if spans:
+        refresh_daily_totals(session.connection(), spans)
@@ -6,17 +6,20 @@ from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 
-from app.auth import get_current_admin_user
-from app.database import get_db, engine
+from app.auth import get_current_admin_user, invalidate_user_cache
+from app.anomaly_detection import invalidate_pending_alerts_cache, invalidate_rules_cache
+from app.config import settings
+from app.database import Base, get_db, engine
 from app.models import User, Building
 from app.schemas import ImportSummary, ImportErrorRow
 from app.vit_buildings import vit_building_definitions
 from app.schemas import ReadingCreate
+from app.routers.iot import invalidate_building_code_cache
 from app.ingestion import (
     create_reading_from_payload,
-    parse_import_timestamp,
-    parse_import_utility,
-    parse_import_value,
+    create_readings_bulk,
+    parse_import_dataframe,
+    prefetch_import_buildings,
     resolve_building_for_import,
 )
 import seed_data
@@ -78,44 +81,39 @@ async def import_readings(
         )
 
     total_rows = len(df)
-    success_count = 0
     failed_rows: List[ImportErrorRow] = []
+    # Valid rows are collected and inserted as one batch after validation.
+    pending_rows: List[int] = []
+    pending_payloads: List[ReadingCreate] = []
 
-    for idx, row in df.iterrows():
-        row_number = idx + 2  # header is row 1
+    parsed = parse_import_dataframe(df)
+    # One query for every building label in the file; new buildings are
+    # added to the cache as they are created.
+    building_cache = prefetch_import_buildings(
+        db, parsed.loc[parsed["error"].isna(), "building"].astype(str)
+    )
+    for row in parsed.itertuples():
+        row_number = row.Index + 2  # header is row 1
+        if pd.notna(row.error):
+            failed_rows.append(ImportErrorRow(row_number=row_number, error=row.error))
+            continue
         try:
-            timestamp_raw = row.get("timestamp")
-            building_raw = row.get("building")
-            if pd.isna(building_raw):
-                raise ValueError("building is empty")
-            building_label = str(building_raw).strip()
-            utility_raw = row.get("utility")
-            value_raw = row.get("value")
-
-            reading_date = parse_import_timestamp(timestamp_raw)
-            utility_type = parse_import_utility(utility_raw)
-            value = parse_import_value(value_raw)
-
             with db.begin_nested():
                 building = resolve_building_for_import(
                     db=db,
-                    building_label=building_label,
+                    building_label=str(row.building).strip(),
                     created_by=current_user.id,
+                    cache=building_cache,
                 )
-                payload = ReadingCreate(
-                    building_id=building.id,
-                    utility_type=utility_type,
-                    value=value,
-                    reading_date=reading_date,
-                    notes="Imported via admin CSV/Excel",
-                )
-                create_reading_from_payload(
-                    db=db,
-                    payload=payload,
-                    recorded_by=current_user.id,
-                    notes="Imported via admin CSV/Excel",
-                )
-            success_count += 1
+            payload = ReadingCreate(
+                building_id=building.id,
+                utility_type=row.utility_type,
+                value=row.value,
+                reading_date=row.reading_date.to_pydatetime(),
+                notes="Imported via admin CSV/Excel",
+            )
+            pending_rows.append(row_number)
+            pending_payloads.append(payload)
         except HTTPException as exc:
             failed_rows.append(
                 ImportErrorRow(row_number=row_number, error=str(exc.detail))
@@ -129,6 +127,35 @@ async def import_readings(
                 ImportErrorRow(row_number=row_number, error=f"unexpected error: {exc}")
             )
 
+    success_count = 0
+    try:
+        with db.begin_nested():
+            create_readings_bulk(
+                db=db,
+                payloads=pending_payloads,
+                recorded_by=current_user.id,
+                notes="Imported via admin CSV/Excel",
+            )
+        success_count = len(pending_payloads)
+    except (HTTPException, SQLAlchemyError):
+        # Some row was rejected at insert time; retry with a savepoint per row
+        # so only the offending rows fail.
+        for row_number, payload in zip(pending_rows, pending_payloads):
+            try:
+                with db.begin_nested():
+                    create_reading_from_payload(
+                        db=db,
+                        payload=payload,
+                        recorded_by=current_user.id,
+                        notes="Imported via admin CSV/Excel",
+                    )
+                success_count += 1
+            except HTTPException as exc:
+                failed_rows.append(ImportErrorRow(row_number=row_number, error=str(exc.detail)))
+            except SQLAlchemyError as exc:
+                failed_rows.append(ImportErrorRow(row_number=row_number, error=str(exc)))
+        failed_rows.sort(key=lambda row: row.row_number)
+
     # Final commit for all successfully added rows
     try:
         db.commit()
@@ -208,11 +235,7 @@ async def reset_vit_demo(
     """
     Dev-only: drop and recreate all tables, then reseed canonical VIT demo data.
     """
-    from app.database import Base
-
     # Hard guard: only allow in debug/dev environments
-    from app.config import settings
-
     if not settings.debug:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -225,6 +248,11 @@ async def reset_vit_demo(
 
     # Seed default data (admin/user + VIT buildings + sample readings)
     seed_data.seed_data()
+    # Rows were recreated with new ids; drop cached auth/rule/alert/building snapshots.
+    invalidate_user_cache()
+    invalidate_rules_cache()
+    invalidate_pending_alerts_cache()
+    invalidate_building_code_cache()
 
     return {
         "status": "ok",
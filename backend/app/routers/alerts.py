@@ -1,12 +1,13 @@
 from typing import List, Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session, joinedload
 
 from app.database import get_db
 from app.models import Alert, User, AlertStatus, AlertRule, Building
 from app.schemas import AlertResponse, AlertUpdate, AlertRuleCreate, AlertRuleUpdate, AlertRuleResponse
 from app.auth import get_current_active_user, get_current_admin_user
+from app.anomaly_detection import invalidate_pending_alerts_cache, invalidate_rules_cache
 
 router = APIRouter()
 
@@ -20,7 +21,8 @@ def list_alerts(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
-    query = db.query(Alert)
+    # Every alert in the response carries its building name; load them in the same query.
+    query = db.query(Alert).options(joinedload(Alert.building))
 
     if status:
         query = query.filter(Alert.status == status)
@@ -53,7 +55,6 @@ def create_alert_rule(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin_user),
 ):
-    from fastapi import HTTPException
 
     if payload.scope_type not in {'global', 'zone', 'building'}:
         raise HTTPException(status_code=422, detail='scope_type must be one of: global, zone, building')
@@ -64,7 +65,7 @@ def create_alert_rule(
     if payload.scope_type == 'zone' and not payload.zone:
         raise HTTPException(status_code=422, detail='zone is required for zone scope')
     if payload.building_id:
-        exists = db.query(Building).filter(Building.id == payload.building_id).first()
+        exists = db.get(Building, payload.building_id)
         if not exists:
             raise HTTPException(status_code=404, detail='Building not found')
 
@@ -74,7 +75,7 @@ def create_alert_rule(
     )
     db.add(rule)
     db.commit()
-    db.refresh(rule)
+    invalidate_rules_cache()
     return rule
 
 
@@ -85,9 +86,8 @@ def update_alert_rule(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin_user),
 ):
-    from fastapi import HTTPException
 
-    rule = db.query(AlertRule).filter(AlertRule.id == rule_id).first()
+    rule = db.get(AlertRule, rule_id)
     if not rule:
         raise HTTPException(status_code=404, detail='Alert rule not found')
 
@@ -97,14 +97,14 @@ def update_alert_rule(
     if 'condition_type' in update_data and update_data['condition_type'] not in {'threshold', 'zscore', 'rate_of_change'}:
         raise HTTPException(status_code=422, detail='condition_type must be one of: threshold, zscore, rate_of_change')
     if 'building_id' in update_data and update_data['building_id']:
-        exists = db.query(Building).filter(Building.id == update_data['building_id']).first()
+        exists = db.get(Building, update_data['building_id'])
         if not exists:
             raise HTTPException(status_code=404, detail='Building not found')
 
     for field, value in update_data.items():
         setattr(rule, field, value)
     db.commit()
-    db.refresh(rule)
+    invalidate_rules_cache()
     return rule
 
 
@@ -114,13 +114,13 @@ def delete_alert_rule(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin_user),
 ):
-    from fastapi import HTTPException
 
-    rule = db.query(AlertRule).filter(AlertRule.id == rule_id).first()
+    rule = db.get(AlertRule, rule_id)
     if not rule:
         raise HTTPException(status_code=404, detail='Alert rule not found')
     db.delete(rule)
     db.commit()
+    invalidate_rules_cache()
     return None
 
 
@@ -130,8 +130,7 @@ def get_alert(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
-    from fastapi import HTTPException
-    alert = db.query(Alert).filter(Alert.id == alert_id).first()
+    alert = db.get(Alert, alert_id)
     if not alert:
         raise HTTPException(status_code=404, detail='Alert not found')
 
@@ -146,8 +145,7 @@ def acknowledge_alert(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
-    from fastapi import HTTPException
-    alert = db.query(Alert).filter(Alert.id == alert_id).first()
+    alert = db.get(Alert, alert_id)
     if not alert:
         raise HTTPException(status_code=404, detail='Alert not found')
 
@@ -159,7 +157,7 @@ def acknowledge_alert(
     alert.acknowledged_at = datetime.utcnow()
 
     db.commit()
-    db.refresh(alert)
+    invalidate_pending_alerts_cache(alert.building_id, alert.utility_type)
 
     alert_dict = AlertResponse.model_validate(alert).model_dump()
     alert_dict['building_name'] = alert.building.name
@@ -173,8 +171,7 @@ def resolve_alert(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
-    from fastapi import HTTPException
-    alert = db.query(Alert).filter(Alert.id == alert_id).first()
+    alert = db.get(Alert, alert_id)
     if not alert:
         raise HTTPException(status_code=404, detail='Alert not found')
 
@@ -185,7 +182,7 @@ def resolve_alert(
         alert.resolution_notes = alert_update.resolution_notes
 
     db.commit()
-    db.refresh(alert)
+    invalidate_pending_alerts_cache(alert.building_id, alert.utility_type)
 
     alert_dict = AlertResponse.model_validate(alert).model_dump()
     alert_dict['building_name'] = alert.building.name
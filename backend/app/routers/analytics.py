@@ -1,14 +1,26 @@
-from collections import defaultdict
-from typing import List, Optional
-from datetime import datetime, timedelta
-import statistics
-
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from functools import wraps
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from datetime import date, datetime, timedelta
+import asyncio
+import logging
+import math
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import event, func, and_, or_
+from sqlalchemy.exc import SQLAlchemyError
 
-from app.database import get_db
-from app.models import UtilityReading, Building, User, UtilityType, ZoneCategory
+from app.database import SessionLocal, get_db
+from app.models import UtilityReading, UtilityDailyTotal, Building, User, UtilityType, ZoneCategory
+from app.rollups import full_days, naive_utc
 from app.schemas import (
     TotalConsumption,
     BuildingRanking,
@@ -22,8 +34,217 @@ from app.schemas import (
 from app.auth import get_current_active_user
 
 router = APIRouter()
+logger = logging.getLogger("analytics")
+
+# -------------------------------------------------------------------
+# Per-process response cache
+# -------------------------------------------------------------------
+# Dashboards poll these endpoints (and /buildings/overview) with the same
+# parameters, so responses are memoised by (endpoint, query params). Any committed change to readings or
+# buildings clears the cache in this process; the TTL bounds staleness from
+# writes made by other workers. Windows that ended in the past can only change
+# through late/edited readings, so they are kept longer.
+ANALYTICS_CACHE_TTL_SECONDS = 60
+ANALYTICS_HISTORICAL_CACHE_TTL_SECONDS = 600
+ANALYTICS_CACHE_MAX_SIZE = 1024
+_analytics_cache: Dict[Tuple, Tuple[float, Any]] = {}
+# Last successful result per query for `serve_stale_on_error`; never invalidated.
+_last_good_responses: Dict[Tuple, Any] = {}
+# Handlers run in the threadpool; guards both dicts (eviction iterates them).
+_analytics_cache_lock = threading.Lock()
+
+
+# Slow-changing building fields used by /insights and /buildings/overview, so
+# their queries can skip loading buildings. Reloaded every TTL, on commits that
+# touch buildings, and when a reading refers to a building the snapshot does
+# not know yet.
+BUILDING_META_TTL_SECONDS = 300
+
+
+class BuildingMeta(NamedTuple):
+    name: str
+    code: str
+    description: Optional[str]
+    campus_name: Optional[str]
+    zone: Optional[ZoneCategory]
+    zone_label: str
+    tags: Optional[str]
+    is_24x7: bool
+    iot_enabled: bool
+    water_threshold: float
+    electricity_threshold: float
+
+
+_building_meta: Dict[int, BuildingMeta] = {}
+_building_meta_expires_at = 0.0
+
+
+def invalidate_analytics_cache(buildings: bool = False) -> None:
+    """Drop every cached analytics response (and the building snapshot if `buildings`)."""
+    global _building_meta_expires_at
+    with _analytics_cache_lock:
+        _analytics_cache.clear()
+    if buildings:
+        _building_meta_expires_at = 0.0
+
+
+def get_building_meta(db: Session, refresh: bool = False) -> Dict[int, BuildingMeta]:
+    """Snapshot of every building's descriptive fields, keyed by id."""
+    global _building_meta, _building_meta_expires_at
+    now = time.monotonic()
+    if refresh or _building_meta_expires_at <= now:
+        _building_meta = {
+            row.id: BuildingMeta(
+                name=row.name,
+                code=row.code,
+                description=row.description,
+                campus_name=row.campus_name,
+                zone=row.zone,
+                zone_label=row.zone.value if hasattr(row.zone, "value") else (row.zone or "unknown"),
+                tags=row.tags,
+                is_24x7=bool(row.is_24x7),
+                iot_enabled=bool(row.iot_enabled),
+                water_threshold=row.water_threshold,
+                electricity_threshold=row.electricity_threshold,
+            )
+            for row in db.query(
+                Building.id,
+                Building.name,
+                Building.code,
+                Building.description,
+                Building.campus_name,
+                Building.zone,
+                Building.tags,
+                Building.is_24x7,
+                Building.iot_enabled,
+                Building.water_threshold,
+                Building.electricity_threshold,
+            )
+        }
+        _building_meta_expires_at = now + BUILDING_META_TTL_SECONDS
+    return _building_meta
+
+
+@event.listens_for(Session, "after_flush")
+def _track_analytics_writes(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Building):
+            session.info["analytics_stale"] = "buildings"
+            return
+        if isinstance(obj, UtilityReading):
+            session.info.setdefault("analytics_stale", "readings")
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    stale = session.info.pop("analytics_stale", None)
+    if stale:
+        invalidate_analytics_cache(buildings=stale == "buildings")
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_after_rollback(session, previous_transaction):
+    if not session.in_transaction():
+        session.info.pop("analytics_stale", None)
+
+
+def _cache_key_value(value):
+    # Aware datetimes for the same instant compare equal whatever their offset,
+    # but handlers echo the bounds back, so key on the exact wall time and offset.
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class _CachedBody(NamedTuple):
+    """What a cached `Response` is rebuilt from; the object itself is per-request."""
+    body: bytes
+    status_code: int
+    media_type: Optional[str]
+
+
+def _to_cache(result):
+    if isinstance(result, Response):
+        return _CachedBody(bytes(result.body), result.status_code, result.media_type)
+    return result
+
+
+def _from_cache(value):
+    if isinstance(value, _CachedBody):
+        return Response(content=value.body, status_code=value.status_code, media_type=value.media_type)
+    return value
+
+
+def _response_cache_key(handler, kwargs) -> Tuple:
+    params = tuple(sorted(
+        (name, _cache_key_value(value)) for name, value in kwargs.items()
+        if name not in ("db", "current_user")
+    ))
+    return (handler.__name__, params)
+
+
+def cached_response(handler):
+    """
+    Cache an analytics handler's result, keyed on its query parameters.
+
+    A `Response` result is stored as its body and rebuilt on every hit, so no
+    two requests share a response object.
+    """
+
+    @wraps(handler)
+    def wrapper(**kwargs):
+        key = _response_cache_key(handler, kwargs)
+        now = time.monotonic()
+        with _analytics_cache_lock:
+            cached = _analytics_cache.get(key)
+        if cached and cached[0] > now:
+            return _from_cache(cached[1])
+
+        result = handler(**kwargs)
+        end_date = kwargs.get("end_date")
+        historical = end_date is not None and naive_utc(end_date) < datetime.utcnow() - timedelta(days=1)
+        ttl = ANALYTICS_HISTORICAL_CACHE_TTL_SECONDS if historical else ANALYTICS_CACHE_TTL_SECONDS
+        with _analytics_cache_lock:
+            if key not in _analytics_cache and len(_analytics_cache) >= ANALYTICS_CACHE_MAX_SIZE:
+                _analytics_cache.pop(next(iter(_analytics_cache)))
+            _analytics_cache[key] = (now + ttl, _to_cache(result))
+        return result
+
+    return wrapper
+
+
+def serve_stale_on_error(handler):
+    """
+    Fall back to the last successful response when the database errors.
+
+    The last good result per query is kept regardless of cache invalidation and
+    is only ever served on failure, marked with `X-Cache: stale`; with nothing
+    to fall back on the error propagates as before.
+    """
+
+    @wraps(handler)
+    def wrapper(**kwargs):
+        key = _response_cache_key(handler, kwargs)
+        try:
+            result = handler(**kwargs)
+        except SQLAlchemyError:
+            with _analytics_cache_lock:
+                stale = _last_good_responses.get(key)
+            if stale is None:
+                raise
+            logger.warning("[ANALYTICS] %s failed; serving last good response", handler.__name__, exc_info=True)
+            return JSONResponse(content=jsonable_encoder(stale), headers={"X-Cache": "stale"})
+        with _analytics_cache_lock:
+            if key not in _last_good_responses and len(_last_good_responses) >= ANALYTICS_CACHE_MAX_SIZE:
+                _last_good_responses.pop(next(iter(_last_good_responses)))
+            _last_good_responses[key] = result
+        return result
+
+    return wrapper
+
 
 @router.get("/totals", response_model=TotalConsumption)
+@cached_response
 def get_totals(
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
@@ -45,21 +266,18 @@ def get_totals(
     if not end_date:
         end_date = datetime.utcnow()
     
-    water_total = (
-        query.filter(UtilityReading.utility_type == UtilityType.WATER)
-        .with_entities(func.sum(UtilityReading.value))
-        .scalar()
-        or 0.0
-    )
-
-    electricity_total = (
-        query.filter(UtilityReading.utility_type == UtilityType.ELECTRICITY)
-        .with_entities(func.sum(UtilityReading.value))
-        .scalar()
-        or 0.0
-    )
-
-    sample_size = query.count()
+    # One pass over the filtered readings: a sum and count per utility type.
+    totals = {
+        utility_type: (total or 0.0, count)
+        for utility_type, total, count in query.with_entities(
+            UtilityReading.utility_type,
+            func.sum(UtilityReading.value),
+            func.count(UtilityReading.id),
+        ).group_by(UtilityReading.utility_type)
+    }
+    water_total = totals.get(UtilityType.WATER, (0.0, 0))[0]
+    electricity_total = totals.get(UtilityType.ELECTRICITY, (0.0, 0))[0]
+    sample_size = sum(count for _, count in totals.values())
 
     return TotalConsumption(
         total_water=water_total,
@@ -73,6 +291,7 @@ def get_totals(
     )
 
 @router.get("/rankings", response_model=List[BuildingRanking])
+@cached_response
 def get_rankings(
     utility_type: UtilityType = Query(...),
     start_date: Optional[datetime] = Query(None),
@@ -119,7 +338,30 @@ def get_rankings(
     
     return rankings
 
+def _period_bucket(db: Session, period: str, column=UtilityReading.reading_date):
+    """SQL expression for the start of the day/week (Monday)/month containing `column`."""
+    if db.get_bind().dialect.name == "sqlite":
+        if period == "daily":
+            return func.date(column)
+        if period == "weekly":
+            # Next Sunday (or today if Sunday), then back to that week's Monday.
+            return func.date(column, "weekday 0", "-6 days")
+        return func.strftime("%Y-%m-01", column)
+    unit = {"daily": "day", "weekly": "week", "monthly": "month"}[period]
+    return func.date_trunc(unit, column)
+
+
+def _bucket_date(value) -> date:
+    # SQLite returns 'YYYY-MM-DD' strings, PostgreSQL returns timestamps.
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
 @router.get("/summary", response_model=List[TimeSummary])
+@cached_response
 def get_summary(
     period: str = Query(..., pattern="^(daily|weekly|monthly)$"),
     start_date: Optional[datetime] = Query(None),
@@ -137,105 +379,111 @@ def get_summary(
     
     if not end_date:
         end_date = datetime.utcnow()
-    
-    query = db.query(UtilityReading).filter(
-        and_(
-            UtilityReading.reading_date >= start_date,
-            UtilityReading.reading_date <= end_date
+    # Either bound may arrive time zone aware; compare in naive UTC like the
+    # rollup's day buckets (the database session runs in UTC).
+    start_date, end_date = naive_utc(start_date), naive_utc(end_date)
+
+    in_range = and_(
+        UtilityReading.reading_date >= start_date,
+        UtilityReading.reading_date <= end_date
+    )
+    rows = []
+    # Whole days come from the daily rollup; only the partial days at either
+    # end of the range are summed from raw readings.
+    whole_days = full_days(start_date, end_date)
+    if whole_days:
+        first, stop = whole_days
+        day_bucket = _period_bucket(db, period, UtilityDailyTotal.day).label("bucket")
+        rows += (
+            db.query(
+                day_bucket,
+                UtilityDailyTotal.building_id,
+                UtilityDailyTotal.utility_type,
+                func.sum(UtilityDailyTotal.sum_value),
+            )
+            .filter(UtilityDailyTotal.day >= first.date(), UtilityDailyTotal.day < stop.date())
+            .group_by(day_bucket, UtilityDailyTotal.building_id, UtilityDailyTotal.utility_type)
+            .all()
+        )
+        in_range = and_(
+            in_range,
+            or_(UtilityReading.reading_date < first, UtilityReading.reading_date >= stop),
         )
+
+    bucket = _period_bucket(db, period).label("bucket")
+    rows += (
+        db.query(
+            bucket,
+            UtilityReading.building_id,
+            UtilityReading.utility_type,
+            func.sum(UtilityReading.value),
+        )
+        .filter(in_range)
+        .group_by(bucket, UtilityReading.building_id, UtilityReading.utility_type)
+        .all()
     )
-    
+
+    # Pivot the (bucket, building, utility) sums into one summary per bucket.
+    period_data = {}
+    for bucket_value, building_id, utility_type, total in rows:
+        data = period_data.setdefault(
+            _bucket_date(bucket_value),
+            {"water": 0.0, "electricity": 0.0, "buildings": {}},
+        )
+        data[utility_type.value] += total or 0.0
+        building = data["buildings"].setdefault(building_id, {"water": 0.0, "electricity": 0.0})
+        building[utility_type.value] += total or 0.0
+
     summaries = []
-    
-    if period == "daily":
-        # Group by day
-        daily_data = {}
-        for reading in query.all():
-            date_key = reading.reading_date.date()
-            if date_key not in daily_data:
-                daily_data[date_key] = {"water": 0.0, "electricity": 0.0, "buildings": {}}
-            
-            daily_data[date_key][reading.utility_type.value] += reading.value
-            
-            building_id = reading.building_id
-            if building_id not in daily_data[date_key]["buildings"]:
-                daily_data[date_key]["buildings"][building_id] = {"water": 0.0, "electricity": 0.0}
-            daily_data[date_key]["buildings"][building_id][reading.utility_type.value] += reading.value
-        
-        for date, data in sorted(daily_data.items()):
-            building_breakdown = [
-                {"building_id": bid, **values}
-                for bid, values in data["buildings"].items()
-            ]
-            summaries.append(TimeSummary(
-                period="daily",
-                date=datetime.combine(date, datetime.min.time()),
-                total_water=data["water"],
-                total_electricity=data["electricity"],
-                building_breakdown=building_breakdown
-            ))
-    
-    elif period == "weekly":
-        # Group by week
-        weekly_data = {}
-        for reading in query.all():
-            week_start = reading.reading_date - timedelta(days=reading.reading_date.weekday())
-            week_key = week_start.date()
-            if week_key not in weekly_data:
-                weekly_data[week_key] = {"water": 0.0, "electricity": 0.0, "buildings": {}}
-            
-            weekly_data[week_key][reading.utility_type.value] += reading.value
-            
-            building_id = reading.building_id
-            if building_id not in weekly_data[week_key]["buildings"]:
-                weekly_data[week_key]["buildings"][building_id] = {"water": 0.0, "electricity": 0.0}
-            weekly_data[week_key]["buildings"][building_id][reading.utility_type.value] += reading.value
-        
-        for week_start, data in sorted(weekly_data.items()):
-            building_breakdown = [
-                {"building_id": bid, **values}
-                for bid, values in data["buildings"].items()
-            ]
-            summaries.append(TimeSummary(
-                period="weekly",
-                date=datetime.combine(week_start, datetime.min.time()),
-                total_water=data["water"],
-                total_electricity=data["electricity"],
-                building_breakdown=building_breakdown
-            ))
-    
-    else:  # monthly
-        # Group by month
-        monthly_data = {}
-        for reading in query.all():
-            month_key = reading.reading_date.replace(day=1).date()
-            if month_key not in monthly_data:
-                monthly_data[month_key] = {"water": 0.0, "electricity": 0.0, "buildings": {}}
-            
-            monthly_data[month_key][reading.utility_type.value] += reading.value
-            
-            building_id = reading.building_id
-            if building_id not in monthly_data[month_key]["buildings"]:
-                monthly_data[month_key]["buildings"][building_id] = {"water": 0.0, "electricity": 0.0}
-            monthly_data[month_key]["buildings"][building_id][reading.utility_type.value] += reading.value
-        
-        for month_start, data in sorted(monthly_data.items()):
-            building_breakdown = [
-                {"building_id": bid, **values}
-                for bid, values in data["buildings"].items()
-            ]
-            summaries.append(TimeSummary(
-                period="monthly",
-                date=datetime.combine(month_start, datetime.min.time()),
-                total_water=data["water"],
-                total_electricity=data["electricity"],
-                building_breakdown=building_breakdown
-            ))
+    for bucket_date, data in sorted(period_data.items()):
+        building_breakdown = [
+            {"building_id": bid, **values}
+            for bid, values in sorted(data["buildings"].items())
+        ]
+        summaries.append(TimeSummary(
+            period=period,
+            date=datetime.combine(bucket_date, datetime.min.time()),
+            total_water=data["water"],
+            total_electricity=data["electricity"],
+            building_breakdown=building_breakdown
+        ))
     
     return summaries
 
 
+@router.get("/summary/all", response_model=Dict[str, List[TimeSummary]])
+async def get_summary_all(
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Daily, weekly and monthly summaries in one call.
+
+    The three aggregations are independent, so each runs in a worker thread with
+    its own session (and connection) instead of back to back. Results share the
+    /summary response cache.
+    """
+    def summarize(period: str) -> List[TimeSummary]:
+        db = SessionLocal()
+        try:
+            return get_summary(
+                period=period,
+                start_date=start_date,
+                end_date=end_date,
+                db=db,
+                current_user=current_user,
+            )
+        finally:
+            db.close()
+
+    periods = ("daily", "weekly", "monthly")
+    results = await asyncio.gather(*(run_in_threadpool(summarize, period) for period in periods))
+    return dict(zip(periods, results))
+
+
 @router.get("/stats", response_model=AnalyticsStats)
+@cached_response
 def analytics_stats(
     utility_type: UtilityType = Query(...),
     start_date: Optional[datetime] = Query(None),
@@ -261,19 +509,28 @@ def analytics_stats(
                 UtilityReading.reading_date <= end_date,
             )
         )
-        .all()
     )
 
-    values = [r.value for r in readings]
-    sample_size = len(values)
+    # Descriptive stats are aggregated in the database; only the one or two
+    # middle values are fetched for the median.
+    sample_size, mean = readings.with_entities(
+        func.count(UtilityReading.id), func.avg(UtilityReading.value)
+    ).one()
 
     if sample_size == 0:
         mean = median = variance = std_dev = 0.0
     else:
-        mean = statistics.fmean(values)
-        median = statistics.median(values)
-        variance = statistics.pvariance(values) if sample_size > 1 else 0.0
-        std_dev = statistics.pstdev(values) if sample_size > 1 else 0.0
+        deviation = UtilityReading.value - mean
+        variance = readings.with_entities(func.sum(deviation * deviation)).scalar() / sample_size
+        std_dev = math.sqrt(variance)
+        middle = [
+            value
+            for (value,) in readings.with_entities(UtilityReading.value)
+            .order_by(UtilityReading.value)
+            .offset((sample_size - 1) // 2)
+            .limit(2 - sample_size % 2)
+        ]
+        median = sum(middle) / len(middle)
 
     # Per-zone totals
     zone_rows = (
@@ -316,7 +573,44 @@ def analytics_stats(
     )
 
 
+def _aggregate_groups(
+    codes: np.ndarray,
+    keys: List[str],
+    labels: List[str],
+    values: np.ndarray,
+    breach_mask: np.ndarray,
+    anomaly_mask: np.ndarray,
+) -> List[AnalyticsAggregation]:
+    """
+    Per-group totals and flag counts for /insights, largest total first.
+
+    `codes` assigns each row to a group index into `keys`/`labels`; every column is
+    reduced with a single bincount.
+    """
+    size = len(keys)
+    totals = np.bincount(codes, weights=values, minlength=size)
+    counts = np.bincount(codes, minlength=size)
+    breaches = np.bincount(codes, weights=breach_mask, minlength=size)
+    anomalies = np.bincount(codes, weights=anomaly_mask, minlength=size)
+
+    aggregations = [
+        AnalyticsAggregation(
+            key=key,
+            label=labels[i],
+            total=float(totals[i]),
+            sample_size=int(counts[i]),
+            mean=float(totals[i] / counts[i]),
+            threshold_breaches=int(breaches[i]),
+            anomalies=int(anomalies[i]),
+        )
+        for i, key in enumerate(keys)
+    ]
+    aggregations.sort(key=lambda x: x.total, reverse=True)
+    return aggregations
+
+
 @router.get("/insights", response_model=AnalyticsInsights)
+@cached_response
 def analytics_insights(
     utility_type: UtilityType = Query(...),
     start_date: Optional[datetime] = Query(None),
@@ -334,15 +628,18 @@ def analytics_insights(
 
     parsed_building_ids: Optional[List[int]] = None
     if building_ids:
-        parsed_building_ids = []
-        for token in building_ids.split(","):
-            token = token.strip()
-            if token:
-                parsed_building_ids.append(int(token))
+        # int() tolerates surrounding whitespace; empty tokens (e.g. "1,,3,") are skipped.
+        parsed_building_ids = list(map(int, filter(str.strip, building_ids.split(","))))
 
+    # Plain column rows from utility_readings alone; building name, zone and
+    # thresholds come from the in-process building snapshot.
+    buildings = get_building_meta(db)
     query = (
-        db.query(UtilityReading, Building)
-        .join(Building, Building.id == UtilityReading.building_id)
+        db.query(
+            UtilityReading.value,
+            UtilityReading.reading_date,
+            UtilityReading.building_id,
+        )
         .filter(
             and_(
                 UtilityReading.utility_type == utility_type,
@@ -363,119 +660,96 @@ def analytics_insights(
                 status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
                 detail=f"Invalid zone '{zone}'.",
             )
-        query = query.filter(Building.zone == zone_filter)
+        query = query.filter(UtilityReading.building_id.in_(
+            [building_id for building_id, meta in buildings.items() if meta.zone == zone_filter]
+        ))
 
     rows = query.order_by(UtilityReading.reading_date.asc()).all()
-    values = [float(reading.value) for reading, _ in rows]
-    sample_size = len(values)
-
+    if any(row.building_id not in buildings for row in rows):
+        buildings = get_building_meta(db, refresh=True)
+        # Same result as the inner join to buildings this replaces.
+        rows = [row for row in rows if row.building_id in buildings]
+    row_buildings = [buildings[row.building_id] for row in rows]
+    values = np.fromiter((row.value for row in rows), dtype=np.float64, count=len(rows))
+    sample_size = int(values.size)
+
+    # Per-point running total, z-score and trailing moving average (over the last
+    # `moving_window` points, fewer at the start), computed over the whole series at once.
+    # The summary stats reuse those arrays rather than re-scanning the values.
+    cumulative = np.cumsum(values)
     if sample_size == 0:
         mean = median = variance = std_dev = cumulative_sum = 0.0
+        deviations = values
     else:
-        mean = float(statistics.fmean(values))
-        median = float(statistics.median(values))
-        variance = float(statistics.pvariance(values) if sample_size > 1 else 0.0)
-        std_dev = float(statistics.pstdev(values) if sample_size > 1 else 0.0)
-        cumulative_sum = float(sum(values))
-
-    # Aggregations per building and zone
-    by_building = defaultdict(lambda: {"label": "", "zone": "unknown", "values": [], "threshold_breaches": 0, "anomalies": 0})
-    by_zone = defaultdict(lambda: {"label": "", "values": [], "threshold_breaches": 0, "anomalies": 0})
-
-    cumulative_running = 0.0
-    rolling_values: List[float] = []
-    series: List[AnalyticsSeriesPoint] = []
-    threshold_breaches = 0
-    anomalies_detected = 0
+        cumulative_sum = float(cumulative[-1])
+        mean = cumulative_sum / sample_size
+        median = float(np.median(values))
+        deviations = values - mean
+        variance = float(deviations @ deviations) / sample_size
+        std_dev = math.sqrt(variance)
+
+    z_scores = np.zeros_like(values) if std_dev == 0 else deviations / std_dev
+    window_sums = cumulative.copy()
+    window_sums[moving_window:] -= cumulative[:-moving_window]
+    moving_averages = window_sums / np.minimum(np.arange(1, sample_size + 1), moving_window)
+
+    # utility_type is fixed per request, so pick the threshold field once.
+    threshold_field = "water_threshold" if utility_type == UtilityType.WATER else "electricity_threshold"
+    thresholds = np.fromiter(
+        (getattr(meta, threshold_field) for meta in row_buildings), dtype=np.float64, count=sample_size
+    )
+    anomaly_mask = np.abs(z_scores) >= 2.5
+    breach_mask = values > thresholds
+    anomalies_detected = int(anomaly_mask.sum())
+    threshold_breaches = int(breach_mask.sum())
+
+    # Group rows by integer building code (first-seen order); each building's zone
+    # is looked up once and broadcast back to its rows for the zone grouping.
+    building_ids = np.fromiter((row.building_id for row in rows), dtype=np.int64, count=sample_size)
+    building_codes, unique_building_ids = pd.factorize(building_ids)
+    building_metas = [buildings[int(building_id)] for building_id in unique_building_ids]
+    building_zones = np.array([meta.zone_label for meta in building_metas], dtype=object)
+    zone_codes, unique_zones = pd.factorize(building_zones[building_codes])
+
+    per_building = _aggregate_groups(
+        building_codes,
+        [str(building_id) for building_id in unique_building_ids],
+        [meta.name for meta in building_metas],
+        values,
+        breach_mask,
+        anomaly_mask,
+    )
+    per_zone = _aggregate_groups(
+        zone_codes, list(unique_zones), list(unique_zones), values, breach_mask, anomaly_mask
+    )
 
-    for reading, building in rows:
-        zone_value = building.zone.value if hasattr(building.zone, "value") else (building.zone or "unknown")
-        threshold = float(
-            building.water_threshold if utility_type == UtilityType.WATER else building.electricity_threshold
-        )
-        value = float(reading.value)
-        z_score = 0.0 if std_dev == 0 else (value - mean) / std_dev
-        is_anomaly = abs(z_score) >= 2.5
-        is_threshold_breach = value > threshold
-
-        if is_anomaly:
-            anomalies_detected += 1
-        if is_threshold_breach:
-            threshold_breaches += 1
-
-        building_key = str(building.id)
-        building_bucket = by_building[building_key]
-        building_bucket["label"] = building.name
-        building_bucket["zone"] = zone_value
-        building_bucket["values"].append(value)
-        if is_threshold_breach:
-            building_bucket["threshold_breaches"] += 1
-        if is_anomaly:
-            building_bucket["anomalies"] += 1
-
-        zone_bucket = by_zone[zone_value]
-        zone_bucket["label"] = zone_value
-        zone_bucket["values"].append(value)
-        if is_threshold_breach:
-            zone_bucket["threshold_breaches"] += 1
-        if is_anomaly:
-            zone_bucket["anomalies"] += 1
-
-        cumulative_running += value
-        rolling_values.append(value)
-        if len(rolling_values) > moving_window:
-            rolling_values.pop(0)
-        moving_avg = float(sum(rolling_values) / len(rolling_values))
+    series: List[AnalyticsSeriesPoint] = []
 
+    for row, meta, value, z_score, cumulative_running, moving_avg, is_anomaly in zip(
+        rows,
+        row_buildings,
+        values.tolist(),
+        z_scores.tolist(),
+        cumulative.tolist(),
+        moving_averages.tolist(),
+        anomaly_mask.tolist(),
+    ):
+        # Every field is computed here from typed columns/arrays, so skip per-point validation.
         series.append(
-            AnalyticsSeriesPoint(
-                date=reading.reading_date,
+            AnalyticsSeriesPoint.model_construct(
+                date=row.reading_date,
                 value=value,
                 moving_average=moving_avg,
                 cumulative_sum=float(cumulative_running),
                 z_score=float(z_score),
                 is_anomaly=is_anomaly,
-                building_id=building.id,
-                building_name=building.name,
-                zone=zone_value,
-            )
-        )
-
-    per_building: List[AnalyticsAggregation] = []
-    for key, bucket in by_building.items():
-        vals = bucket["values"]
-        total = float(sum(vals))
-        per_building.append(
-            AnalyticsAggregation(
-                key=key,
-                label=bucket["label"],
-                total=total,
-                sample_size=len(vals),
-                mean=float(total / len(vals) if vals else 0.0),
-                threshold_breaches=int(bucket["threshold_breaches"]),
-                anomalies=int(bucket["anomalies"]),
-            )
-        )
-    per_building.sort(key=lambda x: x.total, reverse=True)
-
-    per_zone: List[AnalyticsAggregation] = []
-    for key, bucket in by_zone.items():
-        vals = bucket["values"]
-        total = float(sum(vals))
-        per_zone.append(
-            AnalyticsAggregation(
-                key=key,
-                label=bucket["label"],
-                total=total,
-                sample_size=len(vals),
-                mean=float(total / len(vals) if vals else 0.0),
-                threshold_breaches=int(bucket["threshold_breaches"]),
-                anomalies=int(bucket["anomalies"]),
+                building_id=row.building_id,
+                building_name=meta.name,
+                zone=meta.zone_label,
             )
         )
-    per_zone.sort(key=lambda x: x.total, reverse=True)
 
-    return AnalyticsInsights(
+    insights = AnalyticsInsights(
         utility_type=utility_type,
         start_date=start_date,
         end_date=end_date,
@@ -496,3 +770,7 @@ def analytics_insights(
         per_zone=per_zone,
         series=series,
     )
+    # The series can hold thousands of points: serialise straight to JSON bytes with
+    # pydantic-core instead of jsonable_encoder + json.dumps. response_model still
+    # documents the schema.
+    return Response(content=insights.model_dump_json(), media_type="application/json")
@@ -32,7 +32,6 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
     db.add(db_user)
     db.commit()
-    db.refresh(db_user)
     return db_user
 
 @router.post("/login", response_model=Token)
@@ -2,11 +2,12 @@ from datetime import datetime, timedelta
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import and_, case, func
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.models import Building, User, UtilityReading, UtilityType, Alert, AlertRule, IoTDevice
+from app.models import Building, User, UtilityReading, UtilityDailyTotal, UtilityType, Alert, AlertRule, IoTDevice
 from app.schemas import (
     BuildingCreate,
     BuildingUpdate,
@@ -15,6 +16,9 @@ from app.schemas import (
     BuildingOverviewItem,
 )
 from app.auth import get_current_active_user, get_current_admin_user
+from app.anomaly_detection import invalidate_pending_alerts_cache, invalidate_rules_cache
+from app.routers.analytics import cached_response, get_building_meta, serve_stale_on_error
+from app.routers.iot import invalidate_building_code_cache
 
 router = APIRouter()
 
@@ -34,7 +38,18 @@ def list_buildings(
     return buildings
 
 
+def _trend_pct(current, previous):
+    """SQL % change from `previous` to `current` (100 when growing from nothing)."""
+    return case(
+        (previous > 0, (current - previous) / previous * 100.0),
+        (current > 0, 100.0),
+        else_=0.0,
+    )
+
+
 @router.get("/overview", response_model=BuildingOverviewResponse)
+@serve_stale_on_error
+@cached_response
 def building_overview(
     campus_name: Optional[str] = Query("VIT Vellore"),
     days: int = Query(30, ge=1, le=365),
@@ -46,119 +61,80 @@ def building_overview(
     previous_end_date = start_date
     previous_start_date = previous_end_date - timedelta(days=days)
 
-    buildings_query = db.query(Building)
-    if campus_name:
-        buildings_query = buildings_query.filter(Building.campus_name == campus_name)
-    buildings = buildings_query.order_by(Building.name.asc()).all()
-
-    if not buildings:
-        return BuildingOverviewResponse(
-            campus_name=campus_name or "VIT Vellore",
-            start_date=start_date,
-            end_date=end_date,
-            previous_start_date=previous_start_date,
-            previous_end_date=previous_end_date,
-            sample_size=0,
-            buildings=[],
-        )
-
-    building_ids = [b.id for b in buildings]
-
-    current_rows = (
-        db.query(
-            UtilityReading.building_id.label("building_id"),
-            func.sum(
-                case((UtilityReading.utility_type == UtilityType.WATER, UtilityReading.value), else_=0.0)
-            ).label("water"),
-            func.sum(
-                case((UtilityReading.utility_type == UtilityType.ELECTRICITY, UtilityReading.value), else_=0.0)
-            ).label("electricity"),
-            func.count(UtilityReading.id).label("sample_size"),
+    # Current and previous windows are adjacent, so one pass over both
+    # windows with conditional sums yields every total.
+    in_current = UtilityReading.reading_date >= start_date
+    is_water = UtilityReading.utility_type == UtilityType.WATER
+    is_electricity = UtilityReading.utility_type == UtilityType.ELECTRICITY
+    water = func.sum(case((and_(in_current, is_water), UtilityReading.value), else_=0.0))
+    electricity = func.sum(case((and_(in_current, is_electricity), UtilityReading.value), else_=0.0))
+    previous_water = func.sum(case((and_(~in_current, is_water), UtilityReading.value), else_=0.0))
+    previous_electricity = func.sum(case((and_(~in_current, is_electricity), UtilityReading.value), else_=0.0))
+    totals_query = (
+        select(
+            UtilityReading.building_id,
+            water.label("water_total"),
+            electricity.label("electricity_total"),
+            (water + electricity).label("total_consumption"),
+            _trend_pct(water, previous_water).label("water_trend_pct"),
+            _trend_pct(electricity, previous_electricity).label("electricity_trend_pct"),
+            func.count(case((in_current, UtilityReading.id))).label("sample_size"),
         )
-        .filter(
-            and_(
-                UtilityReading.building_id.in_(building_ids),
-                UtilityReading.reading_date >= start_date,
-                UtilityReading.reading_date < end_date,
-            )
+        .where(
+            UtilityReading.reading_date >= previous_start_date,
+            UtilityReading.reading_date < end_date,
         )
         .group_by(UtilityReading.building_id)
-        .all()
     )
-
-    previous_rows = (
-        db.query(
-            UtilityReading.building_id.label("building_id"),
-            func.sum(
-                case((UtilityReading.utility_type == UtilityType.WATER, UtilityReading.value), else_=0.0)
-            ).label("water"),
-            func.sum(
-                case((UtilityReading.utility_type == UtilityType.ELECTRICITY, UtilityReading.value), else_=0.0)
-            ).label("electricity"),
-        )
-        .filter(
-            and_(
-                UtilityReading.building_id.in_(building_ids),
-                UtilityReading.reading_date >= previous_start_date,
-                UtilityReading.reading_date < previous_end_date,
-            )
+    if campus_name:
+        # Scope by join rather than a bound list of every campus building id.
+        totals_query = totals_query.join(Building, Building.id == UtilityReading.building_id).where(
+            Building.campus_name == campus_name
         )
-        .group_by(UtilityReading.building_id)
-        .all()
-    )
-
-    current_map = {
-        row.building_id: {
-            "water": float(row.water or 0.0),
-            "electricity": float(row.electricity or 0.0),
-            "sample_size": int(row.sample_size or 0),
-        }
-        for row in current_rows
+    # Plain column tuples, already shaped like the item's usage fields.
+    empty_totals = {
+        "water_total": 0.0,
+        "electricity_total": 0.0,
+        "total_consumption": 0.0,
+        "water_trend_pct": 0.0,
+        "electricity_trend_pct": 0.0,
+        "sample_size": 0,
     }
-    previous_map = {
-        row.building_id: {
-            "water": float(row.water or 0.0),
-            "electricity": float(row.electricity or 0.0),
-        }
-        for row in previous_rows
-    }
-
-    def trend_pct(current: float, previous: float) -> float:
-        if previous <= 0:
-            return 0.0 if current <= 0 else 100.0
-        return ((current - previous) / previous) * 100.0
+    totals = {row.pop("building_id"): row for row in map(dict, db.execute(totals_query).mappings())}
 
-    items: List[BuildingOverviewItem] = []
-    total_sample_size = 0
-    for building in buildings:
-        current = current_map.get(building.id, {"water": 0.0, "electricity": 0.0, "sample_size": 0})
-        previous = previous_map.get(building.id, {"water": 0.0, "electricity": 0.0})
-        water_total = current["water"]
-        electricity_total = current["electricity"]
-        sample_size = current["sample_size"]
-        total_sample_size += sample_size
+    # Building fields come from the shared in-process snapshot; only the
+    # reading aggregate above hits the database. A building created since
+    # the snapshot was taken forces a refresh so its totals are not dropped.
+    meta_by_id = get_building_meta(db)
+    if any(building_id not in meta_by_id for building_id in totals):
+        meta_by_id = get_building_meta(db, refresh=True)
+    buildings = sorted(
+        (
+            (building_id, meta)
+            for building_id, meta in meta_by_id.items()
+            if not campus_name or meta.campus_name == campus_name
+        ),
+        key=lambda item: item[1].name,
+    )
 
-        items.append(
-            BuildingOverviewItem(
-                id=building.id,
-                name=building.name,
-                code=building.code,
-                description=building.description,
-                campus_name=building.campus_name,
-                zone=building.zone,
-                tags=building.tags,
-                is_24x7=bool(building.is_24x7),
-                iot_enabled=bool(building.iot_enabled),
-                water_threshold=float(building.water_threshold or 0.0),
-                electricity_threshold=float(building.electricity_threshold or 0.0),
-                water_total=water_total,
-                electricity_total=electricity_total,
-                total_consumption=water_total + electricity_total,
-                water_trend_pct=trend_pct(water_total, previous["water"]),
-                electricity_trend_pct=trend_pct(electricity_total, previous["electricity"]),
-                sample_size=sample_size,
-            )
+    items = [
+        BuildingOverviewItem(
+            id=building_id,
+            name=meta.name,
+            code=meta.code,
+            description=meta.description,
+            campus_name=meta.campus_name,
+            zone=meta.zone,
+            tags=meta.tags,
+            is_24x7=meta.is_24x7,
+            iot_enabled=meta.iot_enabled,
+            water_threshold=float(meta.water_threshold or 0.0),
+            electricity_threshold=float(meta.electricity_threshold or 0.0),
+            **totals.get(building_id, empty_totals),
         )
+        for building_id, meta in buildings
+    ]
+    total_sample_size = sum(item.sample_size for item in items)
 
     return BuildingOverviewResponse(
         campus_name=campus_name or "VIT Vellore",
@@ -193,9 +169,14 @@ def create_building(
     else:
         base_code = raw_code.upper()[:16]
 
+    # Every candidate code shares the first 14 characters; fetch them all at once.
+    taken = {
+        existing_code
+        for (existing_code,) in db.query(Building.code).filter(Building.code.like(f"{base_code[:14]}%")).all()
+    }
     code = base_code
     suffix = 1
-    while db.query(Building).filter(Building.code == code).first():
+    while code in taken:
         # Deterministically resolve collisions by suffixing a 2-digit counter
         suffix += 1
         code = f"{base_code[:14]}{suffix:02d}"[:16]
@@ -213,8 +194,15 @@ def create_building(
         created_by=current_user.id,
     )
     db.add(db_building)
-    db.commit()
-    db.refresh(db_building)
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent request took the same code between the lookup and insert.
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Building code already exists",
+        )
     return db_building
 
 @router.get("/{building_id}", response_model=BuildingResponse)
@@ -223,7 +211,7 @@ def get_building(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    building = db.query(Building).filter(Building.id == building_id).first()
+    building = db.get(Building, building_id)
     if not building:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -238,7 +226,7 @@ def update_building(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin_user)
 ):
-    building = db.query(Building).filter(Building.id == building_id).first()
+    building = db.get(Building, building_id)
     if not building:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -265,7 +253,7 @@ def update_building(
         setattr(building, field, value)
     
     db.commit()
-    db.refresh(building)
+    invalidate_building_code_cache()
     return building
 
 @router.delete("/{building_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -274,7 +262,7 @@ def delete_building(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin_user)
 ):
-    building = db.query(Building).filter(Building.id == building_id).first()
+    building = db.get(Building, building_id)
     if not building:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -296,7 +284,11 @@ def delete_building(
     db.query(AlertRule).filter(AlertRule.building_id == building_id).delete(synchronize_session=False)
     db.query(Alert).filter(Alert.building_id == building_id).delete(synchronize_session=False)
     db.query(IoTDevice).filter(IoTDevice.building_id == building_id).delete(synchronize_session=False)
+    db.query(UtilityDailyTotal).filter(UtilityDailyTotal.building_id == building_id).delete(synchronize_session=False)
     db.query(UtilityReading).filter(UtilityReading.building_id == building_id).delete(synchronize_session=False)
     db.delete(building)
     db.commit()
+    invalidate_rules_cache()
+    invalidate_pending_alerts_cache()
+    invalidate_building_code_cache()
     return None
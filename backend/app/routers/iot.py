@@ -1,19 +1,90 @@
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+import threading
+import time
 
-from fastapi import APIRouter, Depends, Header, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
 
 from app.config import settings
 from app.database import get_db
 from app.models import Building, UtilityReading, UtilityType, IoTDevice, User
 from app.schemas import ReadingResponse, IoTDeviceCreate, IoTDeviceUpdate, IoTDeviceResponse, IoTIngestRequest
-from app.anomaly_detection import check_anomalies
+from app.anomaly_detection import run_anomaly_check, run_anomaly_check_bulk
 from app.auth import get_current_admin_user
 
 
 router = APIRouter()
 
+# Upper bound on readings accepted by one /ingest/bulk call.
+IOT_BULK_MAX_READINGS = 1000
+
+# Global-key ingestion resolves building_code on every reading. Codes map to
+# (id, iot_enabled) snapshots for a short TTL; the cache is dropped when a
+# building is updated or deleted and on demo reset. Unknown codes are not
+# cached, so a newly created building is usable immediately.
+BUILDING_CODE_CACHE_TTL_SECONDS = 60
+BUILDING_CODE_CACHE_MAX_SIZE = 1024
+
+
+class IoTBuilding(NamedTuple):
+    id: int
+    iot_enabled: bool
+
+
+_building_code_cache: Dict[str, Tuple[float, IoTBuilding]] = {}
+# Ingest handlers run in the threadpool; eviction iterates the dict.
+_building_code_cache_lock = threading.Lock()
+
+
+def invalidate_building_code_cache() -> None:
+    """Forget every cached building_code lookup."""
+    with _building_code_cache_lock:
+        _building_code_cache.clear()
+
+
+def get_buildings_by_code(db: Session, codes: Iterable[str]) -> Dict[str, IoTBuilding]:
+    """Resolve building codes, querying only those not cached; unknown codes are omitted."""
+    now = time.monotonic()
+    found: Dict[str, IoTBuilding] = {}
+    missing = set()
+    with _building_code_cache_lock:
+        for code in codes:
+            cached = _building_code_cache.get(code)
+            if cached and cached[0] > now:
+                found[code] = cached[1]
+            else:
+                missing.add(code)
+    if missing:
+        rows = db.query(Building.code, Building.id, Building.iot_enabled).filter(Building.code.in_(missing)).all()
+        with _building_code_cache_lock:
+            for code, building_id, iot_enabled in rows:
+                found[code] = IoTBuilding(building_id, bool(iot_enabled))
+                if code not in _building_code_cache and len(_building_code_cache) >= BUILDING_CODE_CACHE_MAX_SIZE:
+                    _building_code_cache.pop(next(iter(_building_code_cache)))
+                _building_code_cache[code] = (now + BUILDING_CODE_CACHE_TTL_SECONDS, found[code])
+    return found
+
+
+def _ensure_iot_enabled(building: Union[Building, IoTBuilding]) -> None:
+    if not getattr(building, 'iot_enabled', False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail='IoT ingestion is disabled for this building.',
+        )
+
+
+def _build_iot_reading(payload: IoTIngestRequest, building: Union[Building, IoTBuilding]) -> UtilityReading:
+    return UtilityReading(
+        building_id=building.id,
+        utility_type=payload.utility,
+        value=payload.value,
+        unit='liters' if payload.utility == UtilityType.WATER else 'kWh',
+        reading_date=payload.timestamp or datetime.utcnow(),
+        notes=f'IoT ingestion from device {payload.device_id}',
+    )
+
 
 def verify_global_iot_api_key(x_api_key: Optional[str]) -> bool:
     configured_key = settings.iot_api_key
@@ -36,21 +107,21 @@ def create_device(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin_user),
 ):
-    building = db.query(Building).filter(Building.id == payload.building_id).first()
+    building = db.get(Building, payload.building_id)
     if not building:
         raise HTTPException(status_code=404, detail='Building not found')
 
-    existing = db.query(IoTDevice).filter(IoTDevice.device_id == payload.device_id).first()
-    if existing:
-        raise HTTPException(status_code=400, detail='Device ID already exists')
-
     device = IoTDevice(
         **payload.model_dump(),
         created_by=current_user.id,
     )
     db.add(device)
-    db.commit()
-    db.refresh(device)
+    try:
+        db.commit()
+    except IntegrityError:
+        # device_id is UNIQUE; let the constraint catch duplicates.
+        db.rollback()
+        raise HTTPException(status_code=400, detail='Device ID already exists')
     return device
 
 
@@ -61,13 +132,13 @@ def update_device(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin_user),
 ):
-    device = db.query(IoTDevice).filter(IoTDevice.id == device_id).first()
+    device = db.get(IoTDevice, device_id)
     if not device:
         raise HTTPException(status_code=404, detail='Device not found')
 
     data = payload.model_dump(exclude_unset=True)
     if 'building_id' in data:
-        building = db.query(Building).filter(Building.id == data['building_id']).first()
+        building = db.get(Building, data['building_id'])
         if not building:
             raise HTTPException(status_code=404, detail='Building not found')
 
@@ -75,7 +146,6 @@ def update_device(
         setattr(device, field, value)
 
     db.commit()
-    db.refresh(device)
     return device
 
 
@@ -85,7 +155,7 @@ def delete_device(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin_user),
 ):
-    device = db.query(IoTDevice).filter(IoTDevice.id == device_id).first()
+    device = db.get(IoTDevice, device_id)
     if not device:
         raise HTTPException(status_code=404, detail='Device not found')
     db.delete(device)
@@ -96,6 +166,7 @@ def delete_device(
 @router.post('/ingest', response_model=ReadingResponse, status_code=status.HTTP_201_CREATED)
 def ingest_reading(
     payload: IoTIngestRequest,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     x_api_key: Optional[str] = Header(None),
     x_device_key: Optional[str] = Header(None),
@@ -107,20 +178,26 @@ def ingest_reading(
     - Global integration key: X-API-Key == settings.iot_api_key (for gateways/batch integrations)
     - Per-device key: X-Device-Key matched against registered device
     """
-    building: Optional[Building] = None
+    building: Optional[Union[Building, IoTBuilding]] = None
 
     using_global_key = verify_global_iot_api_key(x_api_key)
     if using_global_key:
         if not payload.building_code:
             raise HTTPException(status_code=422, detail='building_code is required when using global API key')
-        building = db.query(Building).filter(Building.code == payload.building_code).first()
+        building = get_buildings_by_code(db, [payload.building_code]).get(payload.building_code)
         if not building:
             raise HTTPException(status_code=404, detail=f"Building with code '{payload.building_code}' not found")
     else:
         if not x_device_key:
             raise HTTPException(status_code=401, detail='Missing auth key. Provide X-API-Key or X-Device-Key.')
 
-        device = db.query(IoTDevice).filter(IoTDevice.device_id == payload.device_id).first()
+        # Load the mapped building in the same round-trip as the device.
+        device = (
+            db.query(IoTDevice)
+            .options(joinedload(IoTDevice.building))
+            .filter(IoTDevice.device_id == payload.device_id)
+            .first()
+        )
         if not device or not device.is_active:
             raise HTTPException(status_code=401, detail='Invalid or inactive device')
         if device.device_key != x_device_key:
@@ -129,34 +206,89 @@ def ingest_reading(
         if payload.utility != device.utility_type:
             raise HTTPException(status_code=422, detail='Payload utility does not match device utility type')
 
-        building = db.query(Building).filter(Building.id == device.building_id).first()
+        building = device.building
         if not building:
             raise HTTPException(status_code=404, detail='Mapped building not found')
 
         device.last_seen_at = datetime.utcnow()
 
-    if not getattr(building, 'iot_enabled', False):
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail='IoT ingestion is disabled for this building.',
-        )
-
-    reading_date = payload.timestamp or datetime.utcnow()
-    unit = 'liters' if payload.utility == UtilityType.WATER else 'kWh'
+    _ensure_iot_enabled(building)
 
-    db_reading = UtilityReading(
-        building_id=building.id,
-        utility_type=payload.utility,
-        value=payload.value,
-        unit=unit,
-        reading_date=reading_date,
-        notes=f'IoT ingestion from device {payload.device_id}',
-    )
+    db_reading = _build_iot_reading(payload, building)
     db.add(db_reading)
-    db.flush()
-
-    check_anomalies(db, db_reading)
     db.commit()
-    db.refresh(db_reading)
+    # Devices only need the reading persisted; evaluate alerts after responding.
+    background_tasks.add_task(run_anomaly_check, db_reading.id)
 
     return db_reading
+
+
+@router.post('/ingest/bulk', response_model=List[ReadingResponse], status_code=status.HTTP_201_CREATED)
+def ingest_bulk(
+    payloads: List[IoTIngestRequest],
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    x_api_key: Optional[str] = Header(None),
+    x_device_key: Optional[str] = Header(None),
+):
+    """
+    Batch variant of /ingest for gateways.
+
+    Authenticates like /ingest (the device key must match every referenced
+    device), validates the whole batch up front and writes it in one
+    transaction; any invalid reading rejects the batch.
+    """
+    if len(payloads) > IOT_BULK_MAX_READINGS:
+        raise HTTPException(
+            status_code=422,
+            detail=f'At most {IOT_BULK_MAX_READINGS} readings per request',
+        )
+
+    using_global_key = verify_global_iot_api_key(x_api_key)
+    if using_global_key:
+        if not all(payload.building_code for payload in payloads):
+            raise HTTPException(status_code=422, detail='building_code is required when using global API key')
+        codes = {payload.building_code for payload in payloads}
+        by_code = get_buildings_by_code(db, codes)
+        missing = sorted(codes - by_code.keys())
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Building with code '{missing[0]}' not found")
+        buildings = [by_code[payload.building_code] for payload in payloads]
+    else:
+        if not x_device_key:
+            raise HTTPException(status_code=401, detail='Missing auth key. Provide X-API-Key or X-Device-Key.')
+
+        devices = {
+            d.device_id: d
+            for d in db.query(IoTDevice)
+            .options(joinedload(IoTDevice.building))
+            .filter(IoTDevice.device_id.in_({payload.device_id for payload in payloads}))
+            .all()
+        }
+        buildings = []
+        for payload in payloads:
+            device = devices.get(payload.device_id)
+            if not device or not device.is_active:
+                raise HTTPException(status_code=401, detail='Invalid or inactive device')
+            if device.device_key != x_device_key:
+                raise HTTPException(status_code=401, detail='Invalid device key')
+            if payload.utility != device.utility_type:
+                raise HTTPException(status_code=422, detail='Payload utility does not match device utility type')
+            if not device.building:
+                raise HTTPException(status_code=404, detail='Mapped building not found')
+            buildings.append(device.building)
+
+        seen_at = datetime.utcnow()
+        for device in devices.values():
+            device.last_seen_at = seen_at
+
+    for building in buildings:
+        _ensure_iot_enabled(building)
+    if not buildings:
+        return []
+
+    db_readings = [_build_iot_reading(payload, building) for payload, building in zip(payloads, buildings)]
+    db.add_all(db_readings)
+    db.commit()
+    background_tasks.add_task(run_anomaly_check_bulk, [r.id for r in db_readings])
+    return db_readings
@@ -1,20 +1,22 @@
 from typing import List, Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, tuple_
 
 from app.database import get_db
 from app.models import UtilityReading, User, UtilityType, Building, Alert
 from app.schemas import ReadingCreate, ReadingResponse, ReadingUpdate
 from app.auth import get_current_active_user, get_current_admin_user
 from app.ingestion import create_reading_from_payload
+from app.anomaly_detection import run_anomaly_check
 
 router = APIRouter()
 
 @router.post("", response_model=ReadingResponse, status_code=201)
 def create_reading(
     reading: ReadingCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
@@ -22,9 +24,11 @@ def create_reading(
         db=db,
         payload=reading,
         recorded_by=current_user.id,
+        detect_anomalies=False,
     )
     db.commit()
-    db.refresh(db_reading)
+    # Alerts are derived data; evaluate them after the response is sent.
+    background_tasks.add_task(run_anomaly_check, db_reading.id)
 
     return db_reading
 
@@ -36,11 +40,20 @@ def list_readings(
     end_date: Optional[datetime] = Query(None),
     skip: int = Query(0),
     limit: int = Query(100),
+    before_date: Optional[datetime] = Query(None),
+    before_id: Optional[int] = Query(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    from sqlalchemy.orm import joinedload
-    query = db.query(UtilityReading).options(joinedload(UtilityReading.building))
+    """
+    List readings, newest first.
+
+    For deep pages pass the last row's `reading_date`/`id` as
+    `before_date`/`before_id` instead of a growing `skip`: the next page then
+    starts with an index seek rather than scanning and discarding `skip` rows.
+    """
+    # ReadingResponse carries only building_id, so the building is not loaded.
+    query = db.query(UtilityReading)
     
     if building_id:
         query = query.filter(UtilityReading.building_id == building_id)
@@ -50,8 +63,22 @@ def list_readings(
         query = query.filter(UtilityReading.reading_date >= start_date)
     if end_date:
         query = query.filter(UtilityReading.reading_date <= end_date)
+    if before_date:
+        if before_id is not None:
+            query = query.filter(
+                tuple_(UtilityReading.reading_date, UtilityReading.id) < tuple_(before_date, before_id)
+            )
+        else:
+            query = query.filter(UtilityReading.reading_date < before_date)
     
-    readings = query.order_by(UtilityReading.reading_date.desc()).offset(skip).limit(limit).all()
+    # Newest first with id as a stable tiebreak; with a building filter this
+    # walks ix_readings_bldg_date_util (building_id, reading_date, ...) in order.
+    readings = (
+        query.order_by(UtilityReading.reading_date.desc(), UtilityReading.id.desc())
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
     return readings
 
 @router.get("/{reading_id}", response_model=ReadingResponse)
@@ -60,7 +87,7 @@ def get_reading(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    reading = db.query(UtilityReading).filter(UtilityReading.id == reading_id).first()
+    reading = db.get(UtilityReading, reading_id)
     if not reading:
         raise HTTPException(
             status_code=404,
@@ -76,13 +103,13 @@ def update_reading(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin_user),
 ):
-    reading = db.query(UtilityReading).filter(UtilityReading.id == reading_id).first()
+    reading = db.get(UtilityReading, reading_id)
     if not reading:
         raise HTTPException(status_code=404, detail="Reading not found")
 
     update_data = reading_update.dict(exclude_unset=True)
     if "building_id" in update_data:
-        exists = db.query(Building).filter(Building.id == update_data["building_id"]).first()
+        exists = db.get(Building, update_data["building_id"])
         if not exists:
             raise HTTPException(status_code=404, detail="Building not found")
 
@@ -94,7 +121,6 @@ def update_reading(
         setattr(reading, field, value)
 
     db.commit()
-    db.refresh(reading)
     return reading
 
 
@@ -104,7 +130,7 @@ def delete_reading(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin_user),
 ):
-    reading = db.query(UtilityReading).filter(UtilityReading.id == reading_id).first()
+    reading = db.get(UtilityReading, reading_id)
     if not reading:
         raise HTTPException(status_code=404, detail="Reading not found")
     # Preserve alert history while removing the reading row.
@@ -1,16 +1,21 @@
+import heapq
 from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, case
+from sqlalchemy import func, and_, case, or_
 
 from app.database import get_db
-from app.models import UtilityReading, Building, Alert, User, UtilityType, AlertType
-from app.schemas import ReportData, BuildingRanking
+from app.models import UtilityReading, UtilityDailyTotal, Building, Alert, User, UtilityType, AlertType
+from app.rollups import full_days, naive_utc
+from app.schemas import ReportData, BuildingRanking, BuildingSummary
 from app.auth import get_current_active_user
 
 router = APIRouter()
 
+# Alert types raised by anomaly detection (reported as anomalies_detected)
+ANOMALY_ALERT_TYPES = (AlertType.SPIKE, AlertType.THRESHOLD_BREACH, AlertType.CONTINUOUS_HIGH)
+
 @router.get("/monthly", response_model=ReportData)
 def generate_monthly_report(
     year: int = Query(...),
@@ -36,109 +41,107 @@ def generate_custom_report(
     return _generate_report(db, start_date, end_date)
 
 def _generate_report(db: Session, start_date: datetime, end_date: datetime) -> ReportData:
-    # Get total consumption
-    water_total = db.query(func.sum(UtilityReading.value)).filter(
-        and_(
-            UtilityReading.utility_type == UtilityType.WATER,
-            UtilityReading.reading_date >= start_date,
-            UtilityReading.reading_date < end_date
+    # Filter in naive UTC (like the rollup's day buckets); the form's date
+    # inputs can send an aware bound next to a naive one. Readings, rollup
+    # days and alert timestamps are all compared in the UTC database session.
+    range_start, range_end = naive_utc(start_date), naive_utc(end_date)
+    in_range = and_(
+        UtilityReading.reading_date >= range_start,
+        UtilityReading.reading_date < range_end
+    )
+    rows = []
+    # Whole days come from the daily rollup; only the partial days at either
+    # end of the period are summed from raw readings.
+    whole_days = full_days(range_start, range_end)
+    if whole_days:
+        first, stop = whole_days
+        rows += (
+            db.query(
+                UtilityDailyTotal.building_id,
+                UtilityDailyTotal.utility_type,
+                func.sum(UtilityDailyTotal.sum_value),
+                func.sum(UtilityDailyTotal.count),
+            )
+            .filter(UtilityDailyTotal.day >= first.date(), UtilityDailyTotal.day < stop.date())
+            .group_by(UtilityDailyTotal.building_id, UtilityDailyTotal.utility_type)
+            .all()
         )
-    ).scalar() or 0.0
-    
-    electricity_total = db.query(func.sum(UtilityReading.value)).filter(
-        and_(
-            UtilityReading.utility_type == UtilityType.ELECTRICITY,
-            UtilityReading.reading_date >= start_date,
-            UtilityReading.reading_date < end_date
+        in_range = and_(
+            in_range,
+            or_(UtilityReading.reading_date < first, UtilityReading.reading_date >= stop),
         )
-    ).scalar() or 0.0
-    
-    # Get building summaries (optimized single query)
-    building_summaries_query = db.query(
-        Building.id,
-        Building.name,
-        Building.code,
-        func.sum(
-            case(
-                (UtilityReading.utility_type == UtilityType.WATER, UtilityReading.value),
-                else_=0
-            )
-        ).label('water'),
-        func.sum(
-            case(
-                (UtilityReading.utility_type == UtilityType.ELECTRICITY, UtilityReading.value),
-                else_=0
-            )
-        ).label('electricity')
-    ).outerjoin(
-        UtilityReading,
-        and_(
-            Building.id == UtilityReading.building_id,
-            UtilityReading.reading_date >= start_date,
-            UtilityReading.reading_date < end_date
+    rows += (
+        db.query(
+            UtilityReading.building_id,
+            UtilityReading.utility_type,
+            func.sum(UtilityReading.value),
+            func.count(UtilityReading.id),
         )
-    ).group_by(
-        Building.id, Building.name, Building.code
-    ).all()
-    
+        .filter(in_range)
+        .group_by(UtilityReading.building_id, UtilityReading.utility_type)
+        .all()
+    )
+
+    usage = {}
+    water_readings = {}
+    # Every group has at least one non-NULL value, so sums and counts are never NULL.
+    for building_id, utility_type, total, count in rows:
+        values = usage.setdefault(building_id, {"water": 0.0, "electricity": 0.0})
+        values[utility_type.value] += total
+        if utility_type is UtilityType.WATER:
+            water_readings[building_id] = water_readings.get(building_id, 0) + count
+
+    # Campus totals and the top consumers are derived from the per-building
+    # sums instead of re-querying the same reading range.
+    # Fields come straight from typed columns and float sums; skip validation.
     building_summaries = [
-        {
-            "building_id": bid,
-            "building_name": name,
-            "building_code": code,
-            "water": water or 0.0,
-            "electricity": electricity or 0.0
-        }
-        for bid, name, code, water, electricity in building_summaries_query
-    ]
-    
-    # Get top consumers
-    water_rankings = db.query(
-        Building.id,
-        Building.name,
-        Building.code,
-        func.sum(UtilityReading.value).label('total')
-    ).join(
-        UtilityReading, Building.id == UtilityReading.building_id
-    ).filter(
-        and_(
-            UtilityReading.utility_type == UtilityType.WATER,
-            UtilityReading.reading_date >= start_date,
-            UtilityReading.reading_date < end_date
+        BuildingSummary.model_construct(
+            building_id=bid,
+            building_name=name,
+            building_code=code,
+            **usage.get(bid, {"water": 0.0, "electricity": 0.0}),
         )
-    ).group_by(
-        Building.id, Building.name, Building.code
-    ).order_by(
-        func.sum(UtilityReading.value).desc()
-    ).limit(5).all()
-    
+        for bid, name, code in db.query(Building.id, Building.name, Building.code).order_by(Building.id)
+    ]
+    water_total = sum(summary.water for summary in building_summaries)
+    electricity_total = sum(summary.electricity for summary in building_summaries)
+
+    # Top water consumers among buildings with water readings in the period
+    water_rankings = heapq.nlargest(
+        5,
+        (summary for summary in building_summaries if water_readings.get(summary.building_id)),
+        key=lambda summary: summary.water,
+    )
+
     top_consumers = []
-    for rank, (building_id, name, code, total) in enumerate(water_rankings, 1):
+    for rank, summary in enumerate(water_rankings, 1):
         top_consumers.append(BuildingRanking(
-            building_id=building_id,
-            building_name=name,
-            building_code=code,
-            total_consumption=total or 0.0,
+            building_id=summary.building_id,
+            building_name=summary.building_name,
+            building_code=summary.building_code,
+            total_consumption=summary.water,
             utility_type=UtilityType.WATER,
             rank=rank
         ))
-    
-    # Count alerts
-    alerts_generated = db.query(func.count(Alert.id)).filter(
-        and_(
-            Alert.created_at >= start_date,
-            Alert.created_at < end_date
-        )
-    ).scalar() or 0
-    
-    anomalies_detected = db.query(func.count(Alert.id)).filter(
+
+    # Count alerts (all, and those raised by anomaly detection) in one query
+    alerts_generated, anomalies_detected = db.query(
+        func.count(Alert.id),
+        func.count(
+            case(
+                (
+                    Alert.alert_type.in_(ANOMALY_ALERT_TYPES),
+                    Alert.id,
+                )
+            )
+        ),
+    ).filter(
         and_(
-            Alert.created_at >= start_date,
-            Alert.created_at < end_date,
-            Alert.alert_type.in_([AlertType.SPIKE, AlertType.THRESHOLD_BREACH, AlertType.CONTINUOUS_HIGH])
+            Alert.created_at >= range_start,
+            Alert.created_at < range_end
         )
-    ).scalar() or 0
-    
+    ).one()
+
     return ReportData(
         period_start=start_date,
         period_end=end_date,
@@ -146,6 +149,6 @@ def _generate_report(db: Session, start_date: datetime, end_date: datetime) -> R
         total_electricity=electricity_total,
         building_summaries=building_summaries,
         top_consumers=top_consumers,
-        alerts_generated=alerts_generated,
-        anomalies_detected=anomalies_detected
+        alerts_generated=alerts_generated or 0,
+        anomalies_detected=anomalies_detected or 0
     )
@@ -1,24 +1,88 @@
 from __future__ import annotations
 
 import hashlib
-from typing import Any, Dict, Optional
+import time
+from typing import Any, Dict, Optional, Tuple
 
-from fastapi import APIRouter, Depends, Request
-from jose import JWTError, jwt
-from sqlalchemy import inspect, func
+from fastapi import APIRouter, Depends, Query, Request
+from jwt import ExpiredSignatureError, InvalidTokenError
+from sqlalchemy import inspect, func, text
 from sqlalchemy.orm import Session
 
-from app.config import settings
 from app.database import get_db
-from app.models import Building, UtilityReading, Alert, User
+from app.auth import decode_token, get_user_by_email
+from app.models import Building, UtilityReading, Alert, UserRole
 
 
 router = APIRouter()
 
+# The schema only changes on deploy/migration, so its signature is computed
+# once per database URL; `?refresh=1` recomputes it. Entity counts are polled
+# constantly and only need to be roughly current (PostgreSQL reports the
+# planner's estimate rather than scanning the tables).
+HEALTH_COUNTS_TTL_SECONDS = 5
+
+_schema_signatures: Dict[str, str] = {}
+_health_counts: Optional[Tuple[float, Dict[str, int]]] = None
+
+
+def _schema_signature(db: Session) -> str:
+    """Short hash of the live table/column layout, memoized per database URL."""
+    bind_url = str(db.bind.url)
+    cached = _schema_signatures.get(bind_url)
+    if cached is not None:
+        return cached
+
+    inspector = inspect(db.bind)
+    tables = {}
+    for table_name in sorted(inspector.get_table_names()):
+        cols = inspector.get_columns(table_name)
+        tables[table_name] = [
+            {
+                "name": c["name"],
+                "type": str(c["type"]),
+                "nullable": c.get("nullable", True),
+            }
+            for c in cols
+        ]
+
+    raw = repr(sorted(tables.items()))
+    signature = hashlib.blake2b(raw.encode("utf-8"), digest_size=8).hexdigest()
+    _schema_signatures[bind_url] = signature
+    return signature
+
+
+def _approx_count(db: Session, model) -> int:
+    """Row count of `model`'s table; the planner estimate on PostgreSQL."""
+    if db.bind.dialect.name == "postgresql":
+        estimate = db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE relname = :name"),
+            {"name": model.__tablename__},
+        ).scalar()
+        # -1 until the table has been vacuumed/analyzed at least once
+        if estimate is not None and estimate >= 0:
+            return estimate
+    return db.query(func.count(model.id)).scalar() or 0
+
+
+def _entity_counts(db: Session) -> Dict[str, int]:
+    global _health_counts
+    now = time.monotonic()
+    if _health_counts and _health_counts[0] > now:
+        return _health_counts[1]
+    counts = {
+        "buildings": _approx_count(db, Building),
+        "readings": _approx_count(db, UtilityReading),
+        "alerts": _approx_count(db, Alert),
+    }
+    _health_counts = (now + HEALTH_COUNTS_TTL_SECONDS, counts)
+    return counts
+
 
 @router.get("/health")
 async def system_health(
     request: Request,
+    refresh: bool = Query(False),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     """
@@ -28,6 +92,8 @@ async def system_health(
     - Current user email/role (if token is valid)
     - Basic entity counts
     - Schema signature hash to detect drift between code and DB
+
+    Counts and the schema hash are cached; pass `refresh=1` to recompute both.
     """
     # --- Auth status / current user (non-fatal) ---
     auth_header = request.headers.get("Authorization", "")
@@ -40,24 +106,18 @@ async def system_health(
     if has_auth_header and auth_header.startswith("Bearer "):
         raw_token = auth_header.split(" ", 1)[1].strip()
         try:
-            payload = jwt.decode(
-                raw_token,
-                settings.secret_key,
-                algorithms=[settings.algorithm],
-            )
-            email = payload.get("sub")
-            role = payload.get("role")
+            # Same memoised decode and user snapshot as the auth dependency,
+            # so repeat pollers skip the HMAC check and the user SELECT.
+            email, _, exp = decode_token(raw_token)
+            if exp is not None and exp <= time.time():
+                raise ExpiredSignatureError("Signature has expired")
             if email:
-                user = (
-                    db.query(User)
-                    .filter(User.email == email)
-                    .first()
-                )
+                user = get_user_by_email(db, email)
                 if user:
                     current_user_email = user.email
                     current_user_role = (
                         user.role.value
-                        if hasattr(user.role, "value")
+                        if isinstance(user.role, UserRole)
                         else str(user.role)
                     )
                     auth_status = "authenticated"
@@ -65,30 +125,19 @@ async def system_health(
                     auth_status = "invalid_token"
             else:
                 auth_status = "invalid_token"
-        except JWTError:
+        except InvalidTokenError:
             auth_status = "invalid_token"
 
+    global _health_counts
+    if refresh:
+        _schema_signatures.clear()
+        _health_counts = None
+
     # --- Counts ---
-    building_count = db.query(func.count(Building.id)).scalar() or 0
-    reading_count = db.query(func.count(UtilityReading.id)).scalar() or 0
-    alert_count = db.query(func.count(Alert.id)).scalar() or 0
+    counts = _entity_counts(db)
 
     # --- Schema signature (rough, but stable for a given model set) ---
-    inspector = inspect(db.bind)
-    tables = {}
-    for table_name in sorted(inspector.get_table_names()):
-        cols = inspector.get_columns(table_name)
-        tables[table_name] = [
-            {
-                "name": c["name"],
-                "type": str(c["type"]),
-                "nullable": c.get("nullable", True),
-            }
-            for c in cols
-        ]
-
-    raw = repr(sorted(tables.items()))
-    schema_hash = hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+    schema_hash = _schema_signature(db)
 
     return {
         "status": "ok",
@@ -102,11 +151,7 @@ async def system_health(
             else None,
             "has_authorization_header": has_auth_header,
         },
-        "counts": {
-            "buildings": building_count,
-            "readings": reading_count,
-            "alerts": alert_count,
-        },
+        "counts": dict(counts),
         "schema": {
             "hash": schema_hash,
             "backend_version": "1.0.0",
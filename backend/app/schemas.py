@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr
 from datetime import datetime
 from typing import Optional, List
 from app.models import UserRole, UtilityType, AlertStatus, AlertType, ZoneCategory
@@ -17,8 +17,7 @@ class UserResponse(UserBase):
     is_active: bool
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Auth Schemas
 class Token(BaseModel):
@@ -63,8 +62,7 @@ class BuildingResponse(BuildingBase):
     created_by: Optional[int] = None
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class BuildingOverviewItem(BaseModel):
@@ -121,8 +119,7 @@ class ReadingResponse(ReadingBase):
     recorded_by: Optional[int] = None
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Analytics Schemas
 class TotalConsumption(BaseModel):
@@ -227,8 +224,7 @@ class AlertResponse(AlertBase):
     created_at: datetime
     building_name: Optional[str] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class AlertUpdate(BaseModel):
     resolution_notes: Optional[str] = None
@@ -272,16 +268,23 @@ class AlertRuleResponse(AlertRuleBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Report Schemas
+class BuildingSummary(BaseModel):
+    building_id: int
+    building_name: str
+    building_code: str
+    water: float
+    electricity: float
+
+
 class ReportData(BaseModel):
     period_start: datetime
     period_end: datetime
     total_water: float
     total_electricity: float
-    building_summaries: List[dict]
+    building_summaries: List[BuildingSummary]
     top_consumers: List[BuildingRanking]
     alerts_generated: int
     anomalies_detected: int
@@ -326,8 +329,7 @@ class IoTDeviceResponse(IoTDeviceBase):
     created_by: Optional[int] = None
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class IoTIngestRequest(BaseModel):
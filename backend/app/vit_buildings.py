@@ -1,16 +1,11 @@
 from __future__ import annotations
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 
 from app.models import ZoneCategory
 
 
-def vit_building_definitions() -> List[Dict[str, Any]]:
-  """
-  Canonical VIT Vellore building dataset.
-
-  Codes and names are stable; thresholds are sensible defaults.
-  """
+def _build_vit_buildings() -> List[Dict[str, Any]]:
   campus = "VIT Vellore"
 
   academic_common = [
@@ -169,3 +164,16 @@ def vit_building_definitions() -> List[Dict[str, Any]]:
 
   return all_buildings
 
+
+# Built once at import; the dataset never changes at runtime.
+_VIT_BUILDINGS: Tuple[Dict[str, Any], ...] = tuple(_build_vit_buildings())
+
+
+def vit_building_definitions() -> List[Dict[str, Any]]:
+  """
+  Canonical VIT Vellore building dataset.
+
+  Codes and names are stable; thresholds are sensible defaults. Returns fresh
+  copies, so callers may mutate them.
+  """
+  return [dict(b) for b in _VIT_BUILDINGS]
@@ -4,11 +4,19 @@ Creates all tables in the database
 """
 from app.database import engine, Base
 from app.models import User, Building, UtilityReading, Alert
+from app.rollups import ensure_daily_totals
 
 def init_db():
     """Create all database tables"""
     print("Creating database tables...")
     Base.metadata.create_all(bind=engine)
+    # create_all skips tables that already exist, including their indexes;
+    # add any indexes introduced since the database was first created.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    # Existing readings are summed into utility_daily_totals once.
+    ensure_daily_totals(engine)
     print("Database tables created successfully!")
 
 if __name__ == "__main__":
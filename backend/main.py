@@ -1,10 +1,20 @@
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, contextmanager
 import logging
+import os
+import tempfile
 
-from fastapi import FastAPI, Request
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory file locks, run DDL unserialized
+    fcntl = None
+
+from anyio import to_thread
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.config import settings
 from app.database import engine, Base
+from app.rollups import ensure_daily_totals
 from app.routers import (
     auth,
     buildings,
@@ -17,13 +27,35 @@ from app.routers import (
     system,
 )
 
-logger = logging.getLogger("smartcampus")
+logging.basicConfig(level=logging.INFO)
+
+
+@contextmanager
+def _startup_ddl_lock():
+    """Serialize startup DDL across the worker processes of one host."""
+    if fcntl is None:
+        yield
+        return
+    path = os.path.join(tempfile.gettempdir(), "smartcampus-initdb.lock")
+    with open(path, "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
 
 
 # Create database tables (startup only – see schema health endpoint for drift checks)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    Base.metadata.create_all(bind=engine)
+    # Sync handlers run in anyio's worker threadpool; size it to the DB pool
+    # instead of anyio's fixed default so it is not the first cap under load.
+    to_thread.current_default_thread_limiter().total_tokens = settings.threadpool_size
+    if settings.auto_create_tables:
+        # Workers booting together would otherwise race on the same DDL.
+        with _startup_ddl_lock():
+            Base.metadata.create_all(bind=engine)
+            ensure_daily_totals(engine)
     yield
 
 
@@ -45,43 +77,6 @@ app.add_middleware(
 )
 
 
-@app.middleware("http")
-async def auth_debug_middleware(request: Request, call_next):
-    """
-    Temporary debug middleware: logs Authorization header presence and path.
-    """
-    auth_header = request.headers.get("Authorization", "")
-    has_auth = bool(auth_header)
-    token_prefix = ""
-    if auth_header.startswith("Bearer "):
-        token_value = auth_header.split(" ", 1)[1]
-        token_prefix = token_value[:16]
-
-    logger.info(
-        "[REQ] incoming request",
-        extra={
-            "method": request.method,
-            "path": request.url.path,
-            "has_auth": has_auth,
-            "auth_scheme": auth_header.split(" ", 1)[0] if has_auth else None,
-            "token_prefix": token_prefix,
-        },
-    )
-
-    response = await call_next(request)
-
-    logger.info(
-        "[RES] outgoing response",
-        extra={
-            "method": request.method,
-            "path": request.url.path,
-            "status_code": response.status_code,
-        },
-    )
-
-    return response
-
-
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(buildings.router, prefix="/api/buildings", tags=["Buildings"])
@@ -0,0 +1,19 @@
+"""
+Backend test suite (stdlib unittest; pytest also collects it).
+
+Run from `backend/`:
+
+    python -m unittest discover -s tests -t .
+
+Settings are read when `app.config` is first imported, so the test database
+and fast password hashing are configured here, before any test imports the app.
+"""
+import os
+import tempfile
+
+_db_dir = tempfile.mkdtemp(prefix="smartcampus-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ["DEBUG"] = "False"
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["AUTO_CREATE_TABLES"] = "False"
+os.environ.pop("IOT_API_KEY", None)
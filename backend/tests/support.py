@@ -0,0 +1,84 @@
+import unittest
+from datetime import datetime
+from typing import Iterable, List, Tuple
+
+from fastapi.testclient import TestClient
+
+from app.anomaly_detection import invalidate_pending_alerts_cache, invalidate_rules_cache
+from app.auth import create_access_token, get_password_hash, invalidate_user_cache
+from app.database import Base, SessionLocal, engine
+from app.models import Building, User, UserRole, UtilityReading, UtilityType
+from app.routers import analytics, system
+from app.routers.iot import invalidate_building_code_cache
+from main import app
+
+
+def reset_caches() -> None:
+    """Drop every per-process cache so each test starts from the database."""
+    analytics.invalidate_analytics_cache(buildings=True)
+    analytics._last_good_responses.clear()
+    invalidate_user_cache()
+    invalidate_rules_cache()
+    invalidate_pending_alerts_cache()
+    invalidate_building_code_cache()
+    system._schema_signatures.clear()
+    system._health_counts = None
+
+
+class ApiTestCase(unittest.TestCase):
+    """Fresh schema, an admin user and an authenticated client per test."""
+
+    def setUp(self):
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        reset_caches()
+        self.db = SessionLocal()
+        self.addCleanup(self.db.close)
+
+        self.admin = User(
+            email="admin@campus.edu",
+            hashed_password=get_password_hash("admin123"),
+            full_name="Admin",
+            role=UserRole.ADMIN,
+        )
+        self.db.add(self.admin)
+        self.db.commit()
+
+        token = create_access_token({"sub": self.admin.email, "role": "admin"})
+        self.client = TestClient(app)
+        self.client.headers["Authorization"] = f"Bearer {token}"
+
+    def add_building(self, code: str = "TB", **fields) -> Building:
+        building = Building(
+            name=fields.pop("name", f"Test Building {code}"),
+            code=code,
+            campus_name=fields.pop("campus_name", "VIT Vellore"),
+            water_threshold=fields.pop("water_threshold", 10000.0),
+            electricity_threshold=fields.pop("electricity_threshold", 5000.0),
+            created_by=self.admin.id,
+            **fields,
+        )
+        self.db.add(building)
+        self.db.commit()
+        return building
+
+    def add_readings(
+        self,
+        building: Building,
+        utility_type: UtilityType,
+        readings: Iterable[Tuple[datetime, float]],
+    ) -> List[UtilityReading]:
+        rows = [
+            UtilityReading(
+                building_id=building.id,
+                utility_type=utility_type,
+                value=value,
+                unit="liters" if utility_type == UtilityType.WATER else "kWh",
+                reading_date=reading_date,
+                recorded_by=self.admin.id,
+            )
+            for reading_date, value in readings
+        ]
+        self.db.add_all(rows)
+        self.db.commit()
+        return rows
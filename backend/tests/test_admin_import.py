@@ -0,0 +1,54 @@
+from sqlalchemy import func, text
+
+from app.database import engine
+from app.models import UtilityDailyTotal, UtilityReading
+from tests.support import ApiTestCase
+
+
+class ImportReadingsTests(ApiTestCase):
+    def upload(self, csv: str) -> dict:
+        response = self.client.post(
+            "/api/admin/import-readings",
+            files={"file": ("readings.csv", csv.encode(), "text/csv")},
+        )
+        self.assertEqual(response.status_code, 201, response.text)
+        return response.json()
+
+    def test_invalid_rows_are_reported_and_valid_rows_imported(self):
+        self.add_building(code="TT", name="Technology Tower")
+        summary = self.upload(
+            "timestamp,building,utility,value\n"
+            "2026-10-01T08:00:00Z,TT,water,100\n"
+            "not-a-date,TT,water,100\n"
+            "2026-10-01T09:00:00Z,TT,gas,100\n"
+            "2026-10-01T10:00:00Z,TT,electricity,50\n"
+        )
+        self.assertEqual(summary["success_count"], 2)
+        self.assertEqual([row["row_number"] for row in summary["failed_rows"]], [3, 4])
+        self.assertEqual(self.db.query(UtilityReading).count(), 2)
+
+    def test_row_rejected_at_insert_time_does_not_sink_the_batch(self):
+        self.add_building(code="TT", name="Technology Tower")
+        # Passes validation, but the database refuses it on INSERT.
+        with engine.begin() as connection:
+            connection.execute(text(
+                "CREATE TRIGGER reject_reading BEFORE INSERT ON utility_readings "
+                "WHEN NEW.value = 666 BEGIN SELECT RAISE(ABORT, 'rejected by test trigger'); END"
+            ))
+
+        summary = self.upload(
+            "timestamp,building,utility,value\n"
+            "2026-10-01T08:00:00Z,TT,water,100\n"
+            "2026-10-01T09:00:00Z,TT,water,666\n"
+            "2026-10-01T10:00:00Z,New Hall,water,120\n"
+            "2026-10-01T11:00:00Z,TT,electricity,50\n"
+        )
+
+        self.assertEqual(summary["total_rows"], 4)
+        self.assertEqual(summary["success_count"], 3)
+        self.assertEqual([row["row_number"] for row in summary["failed_rows"]], [3])
+        self.assertIn("rejected by test trigger", summary["failed_rows"][0]["error"])
+        values = sorted(value for (value,) in self.db.query(UtilityReading.value))
+        self.assertEqual(values, [50.0, 100.0, 120.0])
+        rollup_total = self.db.query(func.sum(UtilityDailyTotal.sum_value)).scalar()
+        self.assertAlmostEqual(rollup_total, 270.0)
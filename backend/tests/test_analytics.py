@@ -0,0 +1,157 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from fastapi import Response
+
+from app.models import UtilityType
+from app.routers import analytics
+from tests.support import ApiTestCase
+
+
+def _iso(value: datetime, suffix: str = "") -> str:
+    return value.strftime("%Y-%m-%dT%H:%M:%S") + suffix
+
+
+class SummaryTimeZoneTests(ApiTestCase):
+    """/summary splits whole days off to the rollup; bounds may be aware, naive or mixed."""
+
+    def setUp(self):
+        super().setUp()
+        building = self.add_building()
+        midnight = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.start = midnight - timedelta(days=6)
+        self.end = midnight - timedelta(days=1, hours=-12)
+        self.readings = [
+            (midnight - timedelta(days=days, hours=hours), float(100 + days * 10 + hours))
+            for days in range(10)
+            for hours in (-6, 6)
+        ]
+        self.add_readings(building, UtilityType.WATER, self.readings)
+
+    def expected_water(self, start: datetime, end: datetime) -> float:
+        return sum(value for reading_date, value in self.readings if start <= reading_date <= end)
+
+    def total_water(self, **params) -> float:
+        response = self.client.get("/api/analytics/summary", params={"period": "daily", **params})
+        self.assertEqual(response.status_code, 200, response.text)
+        return sum(bucket["total_water"] for bucket in response.json())
+
+    def test_naive_bounds(self):
+        total = self.total_water(start_date=_iso(self.start), end_date=_iso(self.end))
+        self.assertAlmostEqual(total, self.expected_water(self.start, self.end))
+
+    def test_aware_start_with_default_end(self):
+        total = self.total_water(start_date=_iso(self.start, "Z"))
+        self.assertAlmostEqual(total, self.expected_water(self.start, datetime.utcnow()))
+
+    def test_aware_end_with_default_start(self):
+        default_start = datetime.utcnow() - timedelta(days=7)
+        total = self.total_water(end_date=_iso(self.end, "Z"))
+        self.assertAlmostEqual(total, self.expected_water(default_start, self.end))
+
+    def test_mixed_bounds(self):
+        total = self.total_water(start_date=_iso(self.start, "Z"), end_date=_iso(self.end))
+        self.assertAlmostEqual(total, self.expected_water(self.start, self.end))
+        total = self.total_water(start_date=_iso(self.start), end_date=_iso(self.end, "Z"))
+        self.assertAlmostEqual(total, self.expected_water(self.start, self.end))
+
+    def test_offset_bounds_are_converted_to_utc(self):
+        shifted_start = self.start + timedelta(hours=5, minutes=30)
+        shifted_end = self.end + timedelta(hours=5, minutes=30)
+        total = self.total_water(start_date=_iso(shifted_start, "+05:30"), end_date=_iso(shifted_end, "+05:30"))
+        self.assertAlmostEqual(total, self.expected_water(self.start, self.end))
+
+    def test_summary_all_with_aware_start(self):
+        response = self.client.get("/api/analytics/summary/all", params={"start_date": _iso(self.start, "Z")})
+        self.assertEqual(response.status_code, 200, response.text)
+        expected = self.expected_water(self.start, datetime.utcnow())
+        for period in ("daily", "weekly", "monthly"):
+            total = sum(bucket["total_water"] for bucket in response.json()[period])
+            self.assertAlmostEqual(total, expected)
+
+
+class ResponseCacheTests(ApiTestCase):
+    def test_bounds_within_the_same_minute_are_cached_separately(self):
+        minute = datetime.utcnow().replace(second=0, microsecond=0) - timedelta(days=2)
+        self.add_readings(self.add_building(), UtilityType.WATER, [(minute + timedelta(seconds=30), 50.0)])
+        totals = []
+        for second in (5, 55):
+            response = self.client.get("/api/analytics/totals", params={
+                "start_date": _iso(minute + timedelta(seconds=second)),
+                "end_date": _iso(minute + timedelta(days=1)),
+            })
+            self.assertEqual(response.status_code, 200, response.text)
+            totals.append((response.json()["total_water"], response.json()["period_start"]))
+        self.assertEqual(totals, [
+            (50.0, _iso(minute + timedelta(seconds=5))),
+            (0.0, _iso(minute + timedelta(seconds=55))),
+        ])
+
+    def test_same_instant_at_different_offsets_echoes_each_offset(self):
+        start = datetime(2026, 1, 1, 12, tzinfo=timezone.utc)
+        for tz in (timezone.utc, timezone(timedelta(hours=5, minutes=30))):
+            response = self.client.get("/api/analytics/totals", params={
+                "start_date": start.astimezone(tz).isoformat(),
+                "end_date": "2026-01-02T00:00:00Z",
+            })
+            self.assertEqual(response.status_code, 200, response.text)
+            self.assertEqual(
+                datetime.fromisoformat(response.json()["period_start"].replace("Z", "+00:00")).utcoffset(),
+                tz.utcoffset(None),
+            )
+
+    def test_historical_ttl_converts_offset_end_dates_to_utc(self):
+        # 26 hours ago is historical, although its +05:30 wall-clock time is only 20.5 hours ago.
+        end = datetime.now(timezone(timedelta(hours=5, minutes=30))) - timedelta(hours=26)
+        response = self.client.get("/api/analytics/totals", params={"end_date": end.isoformat()})
+        self.assertEqual(response.status_code, 200, response.text)
+        (expires_at, _), = analytics._analytics_cache.values()
+        self.assertGreater(expires_at - time.monotonic(), analytics.ANALYTICS_CACHE_TTL_SECONDS)
+
+    def test_cached_responses_are_rebuilt_per_hit(self):
+        handler = analytics.cached_response(
+            lambda n: Response(content=b'{"n": 1}', media_type="application/json")
+        )
+        first, second = handler(n=1), handler(n=1)
+        third = handler(n=1)
+        second.headers["X-Request"] = "second"
+        self.assertIsNot(second, third)
+        self.assertEqual((second.body, third.body), (first.body, first.body))
+        self.assertEqual(third.media_type, "application/json")
+        self.assertNotIn("X-Request", third.headers)
+
+    def test_insights_served_from_cache(self):
+        self.add_readings(self.add_building(), UtilityType.WATER, [(datetime.utcnow() - timedelta(hours=1), 40.0)])
+        bodies = []
+        for _ in range(2):
+            response = self.client.get("/api/analytics/insights", params={"utility_type": "water"})
+            self.assertEqual(response.status_code, 200, response.text)
+            self.assertEqual(response.headers["content-type"], "application/json")
+            bodies.append(response.json())
+        self.assertEqual(bodies[0], bodies[1])
+        self.assertEqual(bodies[0]["cumulative_sum"], 40.0)
+
+    def test_concurrent_eviction(self):
+        handler = analytics.cached_response(lambda n: n)
+        errors = []
+
+        def hammer(worker: int):
+            try:
+                for n in range(500):
+                    self.assertEqual(handler(n=worker * 1000 + n), worker * 1000 + n)
+                    if n % 97 == 0:
+                        analytics.invalidate_analytics_cache()
+            except Exception as exc:  # noqa: BLE001
+                errors.append(exc)
+
+        with mock.patch.object(analytics, "ANALYTICS_CACHE_MAX_SIZE", 8):
+            threads = [threading.Thread(target=hammer, args=(worker,)) for worker in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertLessEqual(len(analytics._analytics_cache), 8)
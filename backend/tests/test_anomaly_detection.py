@@ -0,0 +1,183 @@
+import random
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from app import anomaly_detection, ingestion
+from app.anomaly_detection import invalidate_pending_alerts_cache, invalidate_rules_cache
+from app.database import Base, engine
+from app.models import Alert, AlertRule, AlertType, UtilityType, ZoneCategory
+from app.schemas import ReadingCreate
+from tests.support import ApiTestCase
+
+
+class BulkAnomalyDetectionTests(ApiTestCase):
+    def seed(self, seed: int):
+        """Buildings, earlier readings and rules for one scenario; returns the batch to ingest."""
+        rng = random.Random(seed)
+        buildings = [
+            self.add_building(code=f"B{i}", zone=zone, water_threshold=800.0, electricity_threshold=400.0)
+            for i, zone in enumerate((ZoneCategory.ACADEMIC, ZoneCategory.RESIDENTIAL, None))
+        ]
+        base = datetime(2026, 1, 1)
+        for building in buildings:
+            for utility_type in UtilityType:
+                self.add_readings(building, utility_type, [
+                    (base + timedelta(hours=rng.randint(0, 24 * 40)), rng.uniform(0, 1000))
+                    for _ in range(rng.randint(0, 15))
+                ])
+        for _ in range(4):
+            self.db.add(AlertRule(
+                name="rule",
+                scope_type=rng.choice(["global", "zone", "building"]),
+                building_id=rng.choice(buildings).id,
+                zone=rng.choice(list(ZoneCategory)),
+                utility_type=rng.choice(list(UtilityType)),
+                condition_type=rng.choice(["threshold", "zscore", "rate_of_change"]),
+                threshold_value=rng.choice([0.5, 10, 500, 700]),
+                comparison_window_days=rng.choice([1, 7, 30]),
+                consecutive_count=rng.choice([1, 2, 5]),
+            ))
+        self.db.commit()
+        return [
+            ReadingCreate(
+                building_id=rng.choice(buildings).id,
+                utility_type=rng.choice(list(UtilityType)),
+                value=rng.uniform(0, 1500),
+                reading_date=(base + timedelta(hours=rng.randint(0, 24 * 45))).replace(
+                    tzinfo=rng.choice([None, timezone.utc])
+                ),
+            )
+            for _ in range(40)
+        ]
+
+    def alerts(self):
+        return sorted(
+            (a.building_id, a.alert_type, a.utility_type, a.message, a.severity, a.reading_id)
+            for a in self.db.query(Alert)
+        )
+
+    def reset_database(self):
+        self.db.close()
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        invalidate_rules_cache()
+        invalidate_pending_alerts_cache()
+        self.db.merge(self.admin)
+        self.db.commit()
+
+    def test_bulk_matches_row_by_row(self):
+        for seed in range(5):
+            with self.subTest(seed=seed):
+                self.reset_database()
+                for payload in self.seed(seed):
+                    ingestion.create_reading_from_payload(self.db, payload, recorded_by=self.admin.id)
+                self.db.commit()
+                expected = self.alerts()
+
+                self.reset_database()
+                ingestion.create_readings_bulk(self.db, self.seed(seed), recorded_by=self.admin.id)
+                self.db.commit()
+                self.assertEqual(self.alerts(), expected)
+                self.assertTrue(expected)
+
+    def test_bulk_history_work_grows_linearly(self):
+        """Each history row's date is normalised once, not once per later reading in the batch."""
+        building = self.add_building(water_threshold=800.0)
+        self.db.add(AlertRule(
+            name="streak",
+            scope_type="global",
+            utility_type=UtilityType.WATER,
+            condition_type="threshold",
+            threshold_value=500.0,
+            comparison_window_days=7,
+            consecutive_count=3,
+        ))
+        self.db.commit()
+        base = datetime(2026, 1, 1)
+        rng = random.Random(0)
+
+        calls = {}
+        for count in (300, 1200):
+            payloads = [
+                ReadingCreate(
+                    building_id=building.id,
+                    utility_type=UtilityType.WATER,
+                    value=rng.uniform(0, 1000),
+                    reading_date=base + timedelta(days=len(calls) * 100, minutes=30 * i),
+                )
+                for i in range(count)
+            ]
+            with mock.patch.object(
+                anomaly_detection, "naive_utc", wraps=anomaly_detection.naive_utc
+            ) as normalise:
+                ingestion.create_readings_bulk(self.db, payloads, recorded_by=self.admin.id)
+            self.db.commit()
+            calls[count] = normalise.call_count
+
+        self.assertLess(calls[300], 4 * 300)
+        self.assertLess(calls[1200], 4 * (1200 + 300))
+
+
+class PendingContinuousHighTests(ApiTestCase):
+    """The pending continuous-high cache only learns keys from committed transactions."""
+
+    def setUp(self):
+        super().setUp()
+        self.building = self.add_building(water_threshold=100.0)
+        now = datetime.utcnow()
+        self.add_readings(self.building, UtilityType.WATER, [(now - timedelta(hours=h), 150.0) for h in (30, 20, 10)])
+        self.key = (self.building.id, UtilityType.WATER)
+
+    def payload(self) -> ReadingCreate:
+        return ReadingCreate(
+            building_id=self.building.id,
+            utility_type=UtilityType.WATER,
+            value=150.0,
+            reading_date=datetime.utcnow(),
+        )
+
+    def continuous_high_alerts(self) -> int:
+        return self.db.query(Alert).filter(Alert.alert_type == AlertType.CONTINUOUS_HIGH).count()
+
+    def test_rolled_back_alert_is_not_cached(self):
+        for ingest in (
+            lambda: ingestion.create_reading_from_payload(self.db, self.payload(), recorded_by=self.admin.id),
+            lambda: ingestion.create_readings_bulk(self.db, [self.payload()], recorded_by=self.admin.id),
+        ):
+            with self.subTest(ingest=ingest):
+                ingest()
+                self.assertNotIn(self.key, anomaly_detection._pending_continuous_high)
+                self.db.rollback()
+                self.assertNotIn(self.key, anomaly_detection._pending_continuous_high)
+                self.assertEqual(self.continuous_high_alerts(), 0)
+
+        ingestion.create_reading_from_payload(self.db, self.payload(), recorded_by=self.admin.id)
+        self.db.commit()
+        self.assertIn(self.key, anomaly_detection._pending_continuous_high)
+        self.assertEqual(self.continuous_high_alerts(), 1)
+
+    def test_second_reading_in_the_same_transaction_is_deduplicated(self):
+        ingestion.create_reading_from_payload(self.db, self.payload(), recorded_by=self.admin.id)
+        ingestion.create_reading_from_payload(self.db, self.payload(), recorded_by=self.admin.id)
+        self.db.commit()
+        self.assertEqual(self.continuous_high_alerts(), 1)
+
+    def test_reload_overlapping_an_invalidation_is_discarded(self):
+        self.db.add(Alert(
+            building_id=self.building.id,
+            alert_type=AlertType.CONTINUOUS_HIGH,
+            utility_type=UtilityType.WATER,
+            message="high",
+        ))
+        self.db.commit()
+        query = self.db.query
+
+        def resolve_during_select(*entities):
+            # The alert is acknowledged while the reload's SELECT is in flight.
+            anomaly_detection.invalidate_pending_alerts_cache(*self.key)
+            return query(*entities)
+
+        with mock.patch.object(self.db, "query", side_effect=resolve_during_select):
+            anomaly_detection._reload_pending_continuous_high(self.db)
+        self.assertNotIn(self.key, anomaly_detection._pending_continuous_high)
+        self.assertLessEqual(anomaly_detection._pending_continuous_high_expires_at, 0.0)
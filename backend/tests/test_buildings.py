@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from app.models import Building, UtilityReading, UtilityType
+from app.routers import analytics
+from tests.support import ApiTestCase
+
+
+class BuildingOverviewTests(ApiTestCase):
+    """/overview takes building fields from the shared snapshot."""
+
+    def overview(self) -> dict:
+        response = self.client.get("/api/buildings/overview")
+        self.assertEqual(response.status_code, 200, response.text)
+        return {item["code"]: item for item in response.json()["buildings"]}
+
+    def test_building_added_behind_a_warm_snapshot_is_listed(self):
+        self.add_building(code="OLD")
+        self.assertEqual(set(self.overview()), {"OLD"})
+
+        # Written by another process: no session hook drops the snapshot here.
+        building_id = self.db.execute(
+            insert(Building).values(name="New Block", code="NEW", campus_name="VIT Vellore")
+        ).inserted_primary_key[0]
+        self.db.execute(insert(UtilityReading).values(
+            building_id=building_id,
+            utility_type=UtilityType.WATER,
+            value=125.0,
+            unit="liters",
+            reading_date=datetime.utcnow() - timedelta(days=1),
+        ))
+        self.db.commit()
+        analytics.invalidate_analytics_cache()
+
+        items = self.overview()
+        self.assertEqual(set(items), {"NEW", "OLD"})
+        self.assertEqual(items["NEW"]["water_total"], 125.0)
+        self.assertEqual(items["NEW"]["sample_size"], 1)
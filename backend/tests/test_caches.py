@@ -0,0 +1,62 @@
+import threading
+from unittest import mock
+
+from app import auth
+from app.database import SessionLocal
+from app.models import User, UserRole
+from app.routers import iot
+from tests.support import ApiTestCase
+
+
+class BoundedCacheTests(ApiTestCase):
+    """The user and building-code caches are filled from threadpool workers."""
+
+    def hammer(self, lookup) -> list:
+        errors = []
+
+        def worker(index: int):
+            db = SessionLocal()
+            try:
+                for n in range(300):
+                    lookup(db, (index + n) % 12)
+                    if n % 97 == 0:
+                        auth.invalidate_user_cache()
+                        iot.invalidate_building_code_cache()
+            except Exception as exc:  # noqa: BLE001
+                errors.append(exc)
+            finally:
+                db.close()
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
+
+    def test_concurrent_user_cache_eviction(self):
+        self.db.add_all(
+            User(email=f"user{n}@campus.edu", hashed_password="x", full_name=f"User {n}", role=UserRole.USER)
+            for n in range(12)
+        )
+        self.db.commit()
+
+        def lookup(db, n):
+            user = auth.get_user_by_email(db, f"user{n}@campus.edu")
+            self.assertEqual(user.full_name, f"User {n}")
+
+        with mock.patch.object(auth, "USER_CACHE_MAX_SIZE", 4):
+            self.assertEqual(self.hammer(lookup), [])
+        self.assertLessEqual(len(auth._user_cache), 4)
+
+    def test_concurrent_building_code_cache_eviction(self):
+        ids = {f"B{n}": self.add_building(code=f"B{n}").id for n in range(12)}
+
+        def lookup(db, n):
+            found = iot.get_buildings_by_code(db, [f"B{n}", f"B{(n + 1) % 12}"])
+            self.assertEqual({code: hit.id for code, hit in found.items()},
+                             {code: ids[code] for code in (f"B{n}", f"B{(n + 1) % 12}")})
+
+        with mock.patch.object(iot, "BUILDING_CODE_CACHE_MAX_SIZE", 4):
+            self.assertEqual(self.hammer(lookup), [])
+        self.assertLessEqual(len(iot._building_code_cache), 4)
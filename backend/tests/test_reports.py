@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+
+from app.models import UtilityType
+from tests.support import ApiTestCase
+
+
+class CustomReportTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.building = self.add_building()
+        self.readings = [
+            (datetime(2026, 9, 28) + timedelta(hours=7 * step), float(50 + step))
+            for step in range(60)
+        ]
+        self.add_readings(self.building, UtilityType.WATER, self.readings)
+        self.add_readings(self.building, UtilityType.ELECTRICITY, [(datetime(2026, 10, 3, 12), 40.0)])
+
+    def report(self, start_date: str, end_date: str) -> dict:
+        response = self.client.get("/api/reports/custom", params={"start_date": start_date, "end_date": end_date})
+        self.assertEqual(response.status_code, 200, response.text)
+        return response.json()
+
+    def expected_water(self, start: datetime, end: datetime) -> float:
+        return sum(value for reading_date, value in self.readings if start <= reading_date < end)
+
+    def test_naive_bounds(self):
+        report = self.report("2026-10-01T03:00:00", "2026-10-10T00:00:00")
+        expected = self.expected_water(datetime(2026, 10, 1, 3), datetime(2026, 10, 10))
+        self.assertAlmostEqual(report["total_water"], expected)
+        self.assertAlmostEqual(report["total_electricity"], 40.0)
+        self.assertEqual(report["top_consumers"][0]["building_id"], self.building.id)
+
+    def test_mixed_bounds(self):
+        expected = self.expected_water(datetime(2026, 10, 1), datetime(2026, 10, 10))
+        report = self.report("2026-10-01T00:00:00Z", "2026-10-10T00:00:00")
+        self.assertAlmostEqual(report["total_water"], expected)
+        report = self.report("2026-10-01T00:00:00", "2026-10-10T00:00:00Z")
+        self.assertAlmostEqual(report["total_water"], expected)
+
+    def test_offset_bounds_are_converted_to_utc(self):
+        report = self.report("2026-10-01T08:30:00+05:30", "2026-10-09T17:30:00+05:30")
+        expected = self.expected_water(datetime(2026, 10, 1, 3), datetime(2026, 10, 9, 12))
+        self.assertAlmostEqual(report["total_water"], expected)